@@ -21,6 +21,8 @@ words in the cards.
 
 __version__ = "7.0.0"
 
+from . import batch
 from . import conflanguage
 from . import download
 from . import model
+from . import statistics_gui
@@ -0,0 +1,312 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+"""
+Download audio for many notes at once.
+
+Take the notes selected in the card browser, or the notes found by a
+search, and download audio for all of them. There is no review
+dialog. The first file from the best source in preferred_sources is
+added, everything else is deleted. All notes are written in one go at
+the end. When the batch is canceled, what we have so far is written,
+and the next batch for the same notes can pick up where we stopped.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import json
+import os
+import time
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QAction, QProgressDialog
+
+from aqt import mw
+from aqt.utils import askUser, getText, showInfo, tooltip
+from anki.hooks import addHook
+from anki.lang import _
+
+from .download_entry import Action
+from .downloaders.http_session import session
+from .downloaders.throttle import skipped_downloaders
+from .fetch import fetch_processed_entries
+from .get_fields import get_note_fields
+from .instrumentation import StageTimer
+from .language import language_codes_from_nids
+from .note_update import plan_update, register_media, save_notes
+
+preferred_sources = [
+    'Audio pack', 'JapanesePod', 'Duden', 'Merriam-Webster',
+    'Oxford Advanced Learner’s Dictionary', 'Macmillan', 'Collins French',
+    'Collins German', 'Collins Italian', 'Collins Spanish', 'Lexin',
+    'Den Danske Ordbog', 'Islex', 'Leo', 'Beolingus', 'Wiktionary',
+    'HowJSay']
+# The sources we accept files from, best first. These are the
+# ‘Source’ values the downloaders put into the extras. Every
+# downloader in downloaders/__init__.py that gets recorded audio
+# should be here; when you add one there, add its source here, too.
+# Files from other sources, and files the downloader already marked
+# for deletion (like the robot voices) are never added automatically.
+
+skip_filled_fields = True
+# Only download for audio fields that are empty.
+
+notes_in_flight = 4
+# Number of notes we download at the same time. Each note uses the
+# downloaders in parallel as well, see fetch.py. The requests per
+# site are limited in downloaders/throttle.py.
+
+batch_state_path = os.path.join(
+    os.path.dirname(__file__), 'cache', 'batch_state.json')
+
+
+def source_rank(entry):
+    """Return the position of the entry’s source in preferred_sources."""
+    try:
+        return preferred_sources.index(entry.extras.get('Source'))
+    except ValueError:
+        return None
+
+
+def choose_entries(entries):
+    """
+    Decide what to do with the files for one note.
+
+    For each audio field, mark the file from the best source as Add,
+    and all the others as Delete.
+    """
+    best = {}
+    for entry in entries:
+        rank = source_rank(entry)
+        if rank is None or entry.action == Action.Delete:
+            continue
+        if entry.audio_field_name not in best \
+                or rank < source_rank(best[entry.audio_field_name]):
+            best[entry.audio_field_name] = entry
+    chosen = set(id(entry) for entry in best.values())
+    for entry in entries:
+        if id(entry) in chosen:
+            entry.action = Action.Add
+        else:
+            entry.action = Action.Delete
+
+
+def load_batch_state():
+    """Return the saved state of the last batch, or None."""
+    try:
+        with open(batch_state_path, 'r') as state_file:
+            return json.load(state_file)
+    except (IOError, ValueError):
+        return None
+
+
+def save_batch_state(nids, done_nids):
+    """Save which notes of the batch are done."""
+    os.makedirs(os.path.dirname(batch_state_path), exist_ok=True)
+    with open(batch_state_path, 'w') as state_file:
+        json.dump(dict(nids=nids, done=sorted(done_nids)), state_file)
+
+
+def clear_batch_state():
+    """Forget the last batch."""
+    try:
+        os.remove(batch_state_path)
+    except OSError:
+        pass
+
+
+class BatchStats(object):
+    """Counters for the throughput of a batch."""
+    def __init__(self):
+        self.start_time = time.time()
+        self.start_requests = session.request_count
+        self.start_bytes = session.bytes_received
+        self.notes = 0
+        self.files = 0
+        # Files written to the media folder.
+        self.reused = 0
+        # Files we didn’t write, as the media folder had them already.
+        self.failed = 0
+        # Notes where the download went wrong. Run the batch again
+        # for these.
+
+    def text(self):
+        """Return the throughput as text."""
+        seconds = max(time.time() - self.start_time, 0.001)
+        requests = session.request_count - self.start_requests
+        kbytes = (session.bytes_received - self.start_bytes) / 1024
+        text = _(
+            '{notes} notes, {files} files written<br>'
+            '{nps:.2f} notes/s, {rps:.2f} requests/s, {kb:.0f} kB').format(
+                notes=self.notes, files=self.files, nps=self.notes / seconds,
+                rps=requests / seconds, kb=kbytes)
+        if self.reused:
+            text += _(
+                '<br>{reused} files were already in the media '
+                'folder').format(reused=self.reused)
+        if self.failed:
+            text += _(
+                '<br>{failed} notes failed. Run the download again for '
+                'the same notes to retry them.').format(failed=self.failed)
+        skipped = skipped_downloaders()
+        if skipped:
+            text += _('<br>Skipping sites that are down: ') + \
+                ', '.join(skipped)
+        return text
+
+
+def note_job(nid, languages):
+    """
+    Return the field data and language for a note, or None.
+
+    languages is what language_codes_from_nids() returned. This looks
+    at the collection, so call it in the main thread.
+    """
+    note = mw.col.getNote(nid)
+    field_data_list = get_note_fields(note)
+    if skip_filled_fields:
+        field_data_list = [
+            fd for fd in field_data_list if not note[fd.audio_field_name]]
+    if not field_data_list:
+        return None
+    return note, field_data_list, languages[nid]
+
+
+def discard_entries(future):
+    """Throw away the files of a download we don’t want any more."""
+    if future.cancelled():
+        return
+    try:
+        entries = future.result()
+    except Exception:
+        # Failed. Nothing to throw away.
+        return
+    for entry in entries:
+        entry.action = Action.Delete
+        entry.release()
+
+
+def batch_download(nids):
+    """
+    Download audio for all the notes.
+
+    Show a progress dialog with a cancel button. Download for a few
+    notes at a time, pick the files automatically and write all notes
+    at the end.
+    """
+    nids = sorted(nids)
+    done_nids = set()
+    state = load_batch_state()
+    if state and state.get('nids') == nids and state.get('done') \
+            and askUser(_('Continue the unfinished audio download?')):
+        done_nids = set(state['done'])
+    todo_nids = [nid for nid in nids if nid not in done_nids]
+    languages = language_codes_from_nids(todo_nids)
+    stats = BatchStats()
+    progress = QProgressDialog(
+        _('Downloading audio…'), _('Cancel'), 0, len(nids), mw)
+    progress.setWindowModality(Qt.WindowModal)
+    progress.setValue(len(done_nids))
+    progress.show()
+    changed_notes = []
+    notes_saved = False
+    executor = ThreadPoolExecutor(max_workers=notes_in_flight)
+    running = {}
+    canceled = False
+    try:
+        while todo_nids or running:
+            while todo_nids and len(running) < notes_in_flight:
+                nid = todo_nids.pop(0)
+                job = note_job(nid, languages)
+                if not job:
+                    done_nids.add(nid)
+                    continue
+                note, field_data_list, language = job
+                running[executor.submit(
+                    fetch_processed_entries, field_data_list,
+                    language)] = (nid, note)
+            if not running:
+                continue
+            finished, _pending = wait(
+                list(running), timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in finished:
+                nid, note = running.pop(future)
+                try:
+                    entries = future.result()
+                except Exception:
+                    # Try this note again next time.
+                    stats.failed += 1
+                    continue
+                choose_entries(entries)
+                update = plan_update(note, entries)
+                if update.write_media():
+                    changed_notes.append(note)
+                stats.files += update.files_written
+                stats.reused += update.files_reused
+                done_nids.add(nid)
+                stats.notes += 1
+            progress.setValue(len(done_nids))
+            progress.setLabelText(stats.text())
+            mw.app.processEvents()
+            if progress.wasCanceled():
+                canceled = True
+                break
+        if canceled:
+            for future in running:
+                # Don’t wait for the running downloads. Throw away
+                # what they get when they are done.
+                future.cancel()
+                future.add_done_callback(discard_entries)
+        executor.shutdown(wait=False)
+        progress.hide()
+        if changed_notes:
+            # One checkpoint and one write for all notes.
+            with StageTimer('saving notes'):
+                save_notes(changed_notes)
+                register_media()
+            mw.col.save()
+            mw.reset()
+        notes_saved = True
+    finally:
+        progress.hide()
+        if not notes_saved:
+            # Something went wrong. The changed notes were not saved,
+            # so they are not done.
+            done_nids -= set(note.id for note in changed_notes)
+        if canceled or stats.failed or not notes_saved:
+            save_batch_state(nids, done_nids)
+        else:
+            clear_batch_state()
+    showInfo(stats.text(), textFormat='rich')
+
+
+def batch_download_browser(browser):
+    """Download for the selected notes, or for a search."""
+    nids = browser.selectedNotes()
+    if not nids:
+        query, ok = getText(
+            _('Search for the notes to download audio for:'),
+            default=browser.form.searchEdit.lineEdit().text())
+        if not ok or not query:
+            return
+        nids = mw.col.findNotes(query)
+    if not nids:
+        tooltip(_('No notes found.'))
+        return
+    batch_download(nids)
+
+
+def setup_browser_menu(browser):
+    """Add the batch download to the browser’s edit menu."""
+    action = QAction(_('Download audio for notes…'), browser)
+    action.setToolTip(_(
+        'Download audio for the selected notes without a review dialog.'))
+    action.triggered.connect(lambda: batch_download_browser(browser))
+    browser.form.menuEdit.addSeparator()
+    browser.form.menuEdit.addAction(action)
+
+
+addHook('browser.setupMenus', setup_browser_menu)
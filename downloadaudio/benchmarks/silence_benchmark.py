@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+"""
+Compare the pydub and NumPy audio processing.
+
+Run the normalization, silence detection and fades of the audio
+processor on a few clips, once with pydub and once with NumPy, and
+print the times. Also check that both give the same audio.
+
+Usage: silence_benchmark.py [audio files]
+
+Without files, synthetic clips (a tone with silence around it) of a
+few lengths are used. Decoding files needs ffmpeg, like pydub does.
+This runs outside of Anki, it only needs pydub and numpy.
+"""
+
+import os
+import sys
+import time
+
+import numpy
+from pydub import AudioSegment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from processors import audio_processor, numpy_audio
+
+repeats = 3
+# Runs per clip and variant. We show the fastest.
+
+
+def synthetic_clip(seconds, frame_rate=44100, channels=1):
+    """Return a tone between two bits of quiet noise."""
+    rng = numpy.random.RandomState(int(seconds * 1000))
+    frame_count = int(seconds * frame_rate)
+    t = numpy.arange(frame_count) / frame_rate
+    samples = rng.normal(0, 30, frame_count)
+    loud = slice(frame_count // 4, frame_count * 3 // 4)
+    samples[loud] += 8000 * numpy.sin(2 * numpy.pi * 440 * t[loud])
+    samples = numpy.repeat(samples[:, None], channels, axis=1)
+    return AudioSegment(
+        samples.clip(-32768, 32767).astype('<i2').tobytes(),
+        sample_width=2, frame_rate=frame_rate, channels=channels)
+
+
+def best_time(function, segment):
+    """Return the best run time and the result of function(segment)."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(segment)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def run_variant(segment, use_numpy):
+    """Run the processing with pydub or with NumPy."""
+    audio_processor.use_numpy = use_numpy
+    processor = audio_processor.AudioProcessor()
+    return best_time(processor.process_segment, segment)
+
+
+def detect_variant(segment, effects):
+    """Run only the silence detection."""
+    return best_time(
+        lambda seg: effects.detect_nonsilent(
+            seg, min_silence_len=audio_processor.minimum_silence_length,
+            silence_thresh=audio_processor.silence_threshold),
+        segment)
+
+
+def clips():
+    """Yield (name, segment) pairs."""
+    if sys.argv[1:]:
+        for file_name in sys.argv[1:]:
+            yield os.path.basename(file_name), \
+                AudioSegment.from_file(file_name)
+        return
+    for seconds in (0.5, 2, 5, 15):
+        yield '{0} s tone'.format(seconds), synthetic_clip(seconds)
+    yield '5 s stereo', synthetic_clip(5, channels=2)
+
+
+def main():
+    print('{0:24} {1:>10} {2:>10} {3:>10} {4:>10} {5:>8}'.format(
+        'clip', 'detect pd', 'detect np', 'all pd', 'all np', 'same'))
+    for name, segment in clips():
+        if not numpy_audio.can_handle(segment):
+            print('{0:24} not handled by numpy_audio'.format(name))
+            continue
+        detect_pydub, trims_pydub = detect_variant(
+            segment, audio_processor.PydubEffects)
+        detect_numpy, trims_numpy = detect_variant(segment, numpy_audio)
+        all_pydub, result_pydub = run_variant(segment, False)
+        all_numpy, result_numpy = run_variant(segment, True)
+        same = trims_pydub == trims_numpy \
+            and result_pydub.raw_data == result_numpy.raw_data
+        print('{0:24} {1:9.4f}s {2:9.4f}s {3:9.4f}s {4:9.4f}s {5:>8}'.format(
+            name, detect_pydub, detect_numpy, all_pydub, all_numpy,
+            'yes' if same else 'NO'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+"""
+Time the extraction of audio URLs from saved Wiktionary pages.
+
+Usage: wiktionary_benchmark.py directory
+
+The directory should contain saved Wiktionary pages, named
+<language>_<word>.html, like de_Haus.html, en_house.html,
+fr_maison.html or ja_家.html. For each page, print the time to parse
+the whole page, to parse only the tags we need, and to find the URLs
+the old way (pattern formatted for every tag) and the new way (pattern
+compiled once). Also check that both ways find the same URLs.
+
+This runs outside of Anki, it only needs BeautifulSoup.
+"""
+
+import os
+import re
+import sys
+import time
+import urllib.parse
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from downloaders.wiktionary_links import button_onclick_re, link_tags, \
+    ogg_urls, word_ogg_re
+
+repeats = 5
+# Runs per page and variant. We show the fastest.
+
+
+def old_ogg_urls(word_soup, u_word):
+    """Find the URLs the way the Wiktionary downloader used to."""
+    ogg_url_list = []
+    for a in word_soup.findAll('a'):
+        try:
+            href = a['href']
+        except KeyError:
+            continue
+        if re.search(word_ogg_re.format(word=re.escape(u_word)), href,
+                     flags=re.IGNORECASE):
+            ogg_url_list.append(href)
+    for source in word_soup.findAll('source'):
+        try:
+            src = source['src']
+        except KeyError:
+            continue
+        if re.search(word_ogg_re.format(word=re.escape(u_word)), src,
+                     flags=re.IGNORECASE):
+            ogg_url_list.append(src)
+    for button in word_soup.findAll('button'):
+        try:
+            video_url = re.search(
+                button_onclick_re.pattern, button['onclick']).group(1)
+        except (KeyError, AttributeError):
+            continue
+        if re.search(word_ogg_re.format(word=re.escape(u_word)),
+                     video_url, flags=re.IGNORECASE):
+            ogg_url_list.append(video_url)
+    no_dupes = []
+    for url in ogg_url_list:
+        if url not in no_dupes:
+            no_dupes.append(url)
+    return no_dupes
+
+
+def best_time(function):
+    """Return the best run time and the result of function()."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def pages(directory):
+    """Yield (file name, word, page data) for the saved pages."""
+    for file_name in sorted(os.listdir(directory)):
+        base, extension = os.path.splitext(file_name)
+        if extension not in ('.html', '.htm') or '_' not in base:
+            continue
+        _language, word = base.split('_', 1)
+        with open(os.path.join(directory, file_name), 'rb') as page_file:
+            yield file_name, word, page_file.read()
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    print('{0:24} {1:>6} {2:>10} {3:>10} {4:>10} {5:>10} {6:>5}'.format(
+        'page', 'kB', 'full parse', 'strained', 'old find', 'new find',
+        'same'))
+    for file_name, word, data in pages(sys.argv[1]):
+        u_word = urllib.parse.quote(word.encode('utf-8'))
+        full_time, full_soup = best_time(
+            lambda: BeautifulSoup(data, 'html.parser'))
+        strained_time, strained_soup = best_time(
+            lambda: BeautifulSoup(
+                data, 'html.parser', parse_only=SoupStrainer(link_tags)))
+        old_time, old_urls = best_time(
+            lambda: old_ogg_urls(full_soup, u_word))
+        new_time, new_urls = best_time(
+            lambda: ogg_urls(strained_soup, u_word))
+        print('{0:24} {1:6.0f} {2:9.4f}s {3:9.4f}s {4:9.4f}s {5:9.4f}s '
+              '{6:>5}'.format(
+                  file_name, len(data) / 1024, full_time, strained_time,
+                  old_time, new_time,
+                  'yes' if old_urls == new_urls else 'NO'))
+
+
+if __name__ == '__main__':
+    main()
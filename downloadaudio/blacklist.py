@@ -8,10 +8,16 @@
 
 '''
 Maintain a blacklist of undesired files.
+
+The hashes are kept in a set, so checking a download is cheap, however
+long the list gets. The list itself is blacklist.json. Hashes added
+later are appended to blacklist_log.txt, one per line. Every now and
+then the log is merged into blacklist.json.
 '''
 
 import hashlib
 import os
+import threading
 
 # As in the main Anki code.
 try:
@@ -22,44 +28,113 @@ except ImportError:
 
 from aqt import mw
 
+hash_chunk_size = 64 * 1024
+# Bytes we hash at a time.
+compact_after = 100
+# Number of hashes in the log after which we merge it into the json
+# file.
+
 blacklist_hashes = None
+log_length = 0
+blacklist_lock = threading.Lock()
 bl_file_path = os.path.join(os.path.dirname(__file__), 'blacklist.json')
+bl_log_path = os.path.join(os.path.dirname(__file__), 'blacklist_log.txt')
 
 
-def get_hash(file_name):
+def hash_data(data):
     """
-    Return hash of the file.
+    Return the SHA-256 hash object of the data.
 
-    Return hash of the file file_name.  The more important function is
-    that this throws a ValueError when the hash of the file is already
-    in the list.
+    data can be bytes (or a memoryview) or a file opened in binary
+    mode. Either way it is hashed in chunks, so that a big file is
+    never read into memory in one piece.
     """
-    if not blacklist_hashes:
-        load_hashes()
-    retrieved_hash = hashlib.sha256(open(file_name, 'rb').read())
-    if retrieved_hash.hexdigest() in blacklist_hashes:
-        raise ValueError(
+    retrieved_hash = hashlib.sha256()
+    if hasattr(data, 'read'):
+        for chunk in iter(lambda: data.read(hash_chunk_size), b''):
+            retrieved_hash.update(chunk)
+        return retrieved_hash
+    view = memoryview(data)
+    for start in range(0, len(view), hash_chunk_size):
+        retrieved_hash.update(view[start:start + hash_chunk_size])
+    return retrieved_hash
+
+
+class BlacklistedError(ValueError):
+    """The downloaded file is in the blacklist."""
+
+
+def get_hash(data):
+    """
+    Return hash of the audio data.
+
+    Return hash of the downloaded data, as bytes or file.  The more
+    important function is that this throws a BlacklistedError, a
+    ValueError, when the hash of the data is already in the list.
+    """
+    retrieved_hash = hash_data(data)
+    if retrieved_hash.hexdigest() in loaded_hashes():
+        raise BlacklistedError(
             'Retrieved file is in blacklist. (No pronunciation found.)')
     return retrieved_hash
 
 
 def add_black_hash(black_hash):
     """Add a new hash to the list of blacklisted hashes."""
-    global blacklist_hashes
-    if not blacklist_hashes:
-        load_hashes()
-    blacklist_hashes.append(black_hash.hexdigest())
-    save_hashes()
+    global log_length
+    hex_hash = black_hash.hexdigest()
+    hashes = loaded_hashes()
+    with blacklist_lock:
+        if hex_hash in hashes:
+            return
+        hashes.add(hex_hash)
+        with open(bl_log_path, 'a') as log_file:
+            log_file.write(hex_hash + '\n')
+        log_length += 1
+        if log_length >= compact_after:
+            save_hashes()
+
+
+def loaded_hashes():
+    """Return the set of blacklisted hashes, loading it if needed."""
+    if blacklist_hashes is None:
+        with blacklist_lock:
+            if blacklist_hashes is None:
+                load_hashes()
+    return blacklist_hashes
 
 
 def load_hashes():
-    """Load the blacklist from disk."""
-    global blacklist_hashes
-    blacklist_hashes = json.load(open(bl_file_path, 'r'))
+    """Load the blacklist and the log from disk."""
+    global blacklist_hashes, log_length
+    with open(bl_file_path, 'r') as blacklist_file:
+        hashes = set(json.load(blacklist_file))
+    log_length = 0
+    try:
+        with open(bl_log_path, 'r') as log_file:
+            for line in log_file:
+                line = line.strip()
+                if line:
+                    hashes.add(line)
+                    log_length += 1
+    except IOError:
+        pass
+    blacklist_hashes = hashes
 
 
 def save_hashes():
-    """Save the blacklist back to disk."""
-    blacklist_file = open(bl_file_path, 'w')
-    json.dump(blacklist_hashes, blacklist_file, indent=1)
-    blacklist_file.close()
+    """
+    Save the whole blacklist back to disk and empty the log.
+
+    Call with the lock held.
+    """
+    global log_length
+    temp_path = bl_file_path + '.tmp'
+    with open(temp_path, 'w') as blacklist_file:
+        json.dump(sorted(blacklist_hashes), blacklist_file, indent=1)
+    os.replace(temp_path, bl_file_path)
+    try:
+        os.remove(bl_log_path)
+    except OSError:
+        pass
+    log_length = 0
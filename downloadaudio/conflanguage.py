@@ -16,7 +16,7 @@ from aqt.utils import getText, tooltip
 from anki.lang import _
 
 from .language import default_audio_language_code, fl_code_code, \
-    old_al_code_code
+    forget_deck_languages, old_al_code_code
 
 
 def setup_ui(self, Dialog):
@@ -52,6 +52,8 @@ def load_conf(self):
 def save_conf(self):
     """Save the download language tothe configuration."""
     self.conf[fl_code_code] = self.form.audio_download_language.text()
+    # The deck may also have been moved to another options group.
+    forget_deck_languages()
 
 
 def ask_and_set_language_code():
@@ -81,6 +83,7 @@ of the language you are learning.<br>
             conf[fl_code_code] = lang_code
             mw.col.decks.save(conf)
     mw.col.decks.flush()
+    forget_deck_languages()
 
 
 def rename_language_code():
@@ -102,6 +105,7 @@ def rename_language_code():
             old_code_found = True
     if old_code_found:
         mw.col.decks.flush()
+        forget_deck_languages()
     return old_code_found
 
 
@@ -43,18 +43,24 @@ from aqt import mw
 from aqt.utils import tooltip
 from anki.hooks import addHook
 
-from .downloaders import downloaders
 from .download_entry import DownloadEntry, Action
+from .downloaders.throttle import skipped_downloaders
+from .fetch import fetch_processed_entries
 from .get_fields import get_note_fields, get_side_fields
 from .language import language_code_from_card, language_code_from_editor
-from .processors import processor
-from .review_gui import review_entries
+from .note_update import commit_updates, plan_update
+from .review_gui import review_entries, review_streamed_entries
 from .update_gui import update_data
 
 DOWNLOAD_NOTE_SHORTCUT = "q"
 DOWNLOAD_SIDE_SHORTCUT = "t"
 DOWNLOAD_MANUAL_SHORTCUT = "Ctrl+t"
 
+stream_downloads = True
+# Show the review dialog at once and add the files as they come
+# in. Set this to False to wait for all sites before showing the
+# dialog, as we used to.
+
 icons_dir = os.path.join(os.path.dirname(__file__), 'icons')
 # Place were we keep our megafone icon.
 
@@ -63,49 +69,40 @@ def do_download(note, field_data_list, language, hide_text=False):
     """
     Download audio data.
 
-    Go through the list of words and list of sites and download each
-    word from each site. Then call a function that asks the user what
-    to do.
+    Download each word from each site. The downloads run at the same
+    time, see fetch.py. Then call a function that asks the user what
+    to do. With stream_downloads, that dialog is shown right away and
+    fills up while the downloads run.
     """
-    retrieved_entries = []
-    for field_data in field_data_list:
-        if field_data.empty:
-            continue
-        for dloader in downloaders:
-            # Use a public variable to set the language.
-            dloader.language = language
-            try:
-                # Make it easer inside the downloader. If anything
-                # goes wrong, don't catch, or raise whatever you want.
-                dloader.download_files(field_data)
-            except:
-                #  # Uncomment this raise while testing a new
-                #  # downloaders.  Also use the “For testing”
-                #  # downloaders list with your downloader in
-                #  # downloaders.__init__
-                # raise
-                continue
-            retrieved_entries += dloader.downloads_list
-    # Significantly changed the logic. Put all entries in one
-    # list, do stuff with that list of DownloadEntries.
-    for entry in retrieved_entries:
-        # Do the processing before the reviewing now.
-        entry.process()
-    try:
-        retrieved_entries = review_entries(note, retrieved_entries, hide_text)
-        # Now just the dialog, which sets the fields in the entries
-    except ValueError as ve:
-        tooltip(str(ve))
-    except RuntimeError as rte:
-        if 'cancel' in str(rte):
-            for entry in retrieved_entries:
-                entry.action = Action.Delete
-        else:
-            raise
-    for entry in retrieved_entries:
-        entry.dispatch(note)
-    if any(entry.action == Action.Add for entry in retrieved_entries):
-        note.flush()
+    skipped = skipped_downloaders()
+    if skipped:
+        tooltip('Skipping sites that are down: ' + ', '.join(skipped))
+    if stream_downloads:
+        try:
+            retrieved_entries = review_streamed_entries(
+                note, field_data_list, language, hide_text)
+        except ValueError as ve:
+            tooltip(str(ve))
+            return
+    else:
+        # Significantly changed the logic. Put all entries in one
+        # list, do stuff with that list of DownloadEntries. Do the
+        # processing before the reviewing now.
+        retrieved_entries = fetch_processed_entries(
+            field_data_list, language)
+        try:
+            retrieved_entries = review_entries(
+                note, retrieved_entries, hide_text)
+            # Now just the dialog, which sets the fields in the entries
+        except ValueError as ve:
+            tooltip(str(ve))
+        except RuntimeError as rte:
+            if 'cancel' in str(rte):
+                for entry in retrieved_entries:
+                    entry.action = Action.Delete
+            else:
+                raise
+    if commit_updates([plan_update(note, retrieved_entries)]):
         # We have to do different things here, for download during
         # review, we should reload the card and replay. When we are in
         # the add dialog, we do a field update there.
@@ -7,21 +7,26 @@
 # http://www.gnu.org/copyleft/agpl.html
 
 import os
+import tempfile
 
-from .blacklist import add_black_hash
-from .processors import processor
-from .mediafile_utils import unmunge_to_mediafile
-
-if processor:
-    import pydub
-    # See processors/__init__.py. We try the import there. If we have
-    # a processor, this import should work.
+from .processors import get_processor
 
 class DownloadEntry(object):
-    """Data about a single file downloaded by a downloader"""
-    def __init__(self, field_data, file_path, extras, icon):
-        self.file_path = file_path
-        # Absolute file path of the downloaded audio file
+    """Data about a single file downloaded by a downloader
+
+    The audio itself is kept in memory, as audio_data. It is written
+    to disk once, when it goes into the media folder. Files we don’t
+    want never touch the disk, unless they are played in the review
+    dialog. See file_path.
+    """
+    def __init__(self, field_data, audio_data, extras, icon):
+        self.audio_data = audio_data
+        # The downloaded (or processed) audio file, as bytes.
+        self.temp_path = None
+        # Where we wrote audio_data to play it, if we did.
+        self.source_path = None
+        # A file that has the same data as audio_data, if there is
+        # one. It is played from there, so we don’t need a temp file.
         self.word = field_data.word
         self.word_field_name = field_data.word_field_name
         self.audio_field_name = field_data.audio_field_name
@@ -32,13 +37,44 @@ class DownloadEntry(object):
         # meaning numbers or name of speaker. Usually contains the
         # source.
         self.icon = icon
-        # The downloader’s favicon
+        # The downloader’s favicon, as SiteIcon. Call icon.image() to
+        # get the QImage.
         self.action = Action.Add
+        self.site_name = None
+        # The downloader that got the file, for the statistics. Set
+        # by fetch.run_job().
 
     @property
     def display_word(self):
         return self.word
 
+    @property
+    def file_path(self):
+        """Return the name of a file with the audio.
+
+        Write the audio data to a temp file the first time we are
+        asked, unless we have a source_path. This is only needed to
+        play the file.
+        """
+        if self.source_path:
+            return self.source_path
+        if not self.temp_path:
+            with tempfile.NamedTemporaryFile(
+                    delete=False, prefix='anki_audio_',
+                    suffix=self.file_extension) as tfile:
+                tfile.write(self.audio_data)
+            self.temp_path = tfile.name
+        return self.temp_path
+
+    def remove_temp_file(self):
+        """Remove the file written for file_path, if there is one."""
+        if self.temp_path:
+            try:
+                os.remove(self.temp_path)
+            except OSError:
+                pass
+            self.temp_path = None
+
     @property
     def base_name(self):
         return self.word
@@ -58,41 +94,39 @@ class DownloadEntry(object):
         (i.e. normalize, remove silence, convert to preferred format)
         and update self.
         """
+        processor = get_processor()
         if processor:
+            import pydub
+            # See processors/__init__.py. We try the import there. If
+            # we have a processor, this import should work.
             try:
-                new_fp, new_sffx = processor.process(self)
+                new_data, new_sffx, new_path = processor.process(self)
             except pydub.exceptions.CouldntDecodeError:
                 self.action = Action.Delete
             else:
-                self.file_path = new_fp
+                self.remove_temp_file()
+                self.audio_data = new_data
                 self.file_extension = new_sffx
+                self.source_path = new_path
 
-    def dispatch(self, note):
-        """Do what should be done with the downloaded file
-
-        Depending on self.action, do that action.
+    def release(self):
+        """
+        Drop the audio data and the temp file.
 
-        * That is, move the file do the media folder if we want it
-          on the note or just want to keep it.
-        * Add it to the note if that’s what we want.
-        * Delete it if we want just delete or blacklist it.
-        * Blacklist the hash if that’s what we want."""
-        if self.action == Action.Add or self.action == Action.Keep:
-            media_fn = unmunge_to_mediafile(self)
-            if self.action == Action.Add:
-                note[self.audio_field_name] += '[sound:' + media_fn + ']'
-        if self.action == Action.Delete or self.action == Action.Blacklist:
-            os.remove(self.file_path)
-        if self.action == Action.Blacklist:
-            add_black_hash(self.entry_hash)
+        Call this when the entry has been dealt with, see
+        note_update.py.
+        """
+        self.remove_temp_file()
+        self.audio_data = None
+        self.source_path = None
 
 
 class JpodDownloadEntry(DownloadEntry):
     """Data about a single file downloaded by a downloader"""
     def __init__(
-            self, japanese_field_data, file_path, extras, icon, file_hash):
+            self, japanese_field_data, audio_data, extras, icon, file_hash):
         DownloadEntry.__init__(
-            self, japanese_field_data, file_path, extras, icon)
+            self, japanese_field_data, audio_data, extras, icon)
         self.kanji = japanese_field_data.kanji
         self.kana = japanese_field_data.kana
         self.hash_ = file_hash
@@ -8,61 +8,100 @@
 """A list of audio downloaders.
 
 They are intended for use with the Anki2 audiodownload add-on, but can
-possibly be used alone. For each downloader in the list, setting its
-language variable and then calling download_files(text, base, ruby,
-split) downloads audio files to temp files and fills its
-downloads_list with the file names.
+possibly be used alone. For each downloader in get_downloaders(),
+getting a copy with new_job(language) and then calling
+download_files(field_data) on that copy downloads audio files and
+fills its downloads_list with DownloadEntries.
 
-When PyQt4 is installed, this downolads the site icon (favicon) for
-each site first.
+Use downloaders_for(language, split) to get only the downloaders that
+may find something for a field.
+
+The downloader modules (and with them BeautifulSoup) are only imported
+when the downloaders are first needed, not when Anki starts.
+
+When PyQt5 is installed, the site icon (favicon) for each site is
+stored on disk and loaded when it is first shown. See site_icons.py.
 """
 
-from .beolingus import BeolingusDownloader
-from .collins_french import CollinsFrenchDownloader
-from .collins_german import CollinsGermanDownloader
-from .collins_italian import CollinsItalianDownloader
-from .collins_spanish import CollinsSpanishDownloader
-from .den_danske_ordbog import DenDanskeOrdbogDownloader
-from .duden import DudenDownloader
-from .howjsay import HowJSayDownloader
-from .islex import IslexDownloader
-from .japanesepod import JapanesepodDownloader
-from .leo import LeoDownloader
-from .lexin import LexinDownloader
-from .macmillan_american import MacmillanAmericanDownloader
-from .macmillan_british import MacmillanBritishDownloader
-from .mw import MerriamWebsterDownloader
-from .oald import OaldDownloader
-from .wiktionary import WiktionaryDownloader
-
-
-downloaders = [
-    JapanesepodDownloader(),
-    WiktionaryDownloader(),
-    LeoDownloader(),
-    LexinDownloader(),
-    MerriamWebsterDownloader(),
-    # MacmillanAmericanDownloader(),
-    MacmillanBritishDownloader(),
-    OaldDownloader(),
-    DudenDownloader(),
-    DenDanskeOrdbogDownloader(),
-    HowJSayDownloader(),
-    IslexDownloader(),
-    CollinsFrenchDownloader(),
-    CollinsGermanDownloader(),
-    CollinsItalianDownloader(),
-    CollinsSpanishDownloader(),
-    BeolingusDownloader(),
+import importlib
+import threading
+
+downloader_classes = [
+    ('audio_pack', 'AudioPackDownloader'),
+    # ('japanesepod', 'JapanesepodDownloader'),
+    ('wiktionary', 'WiktionaryDownloader'),
+    ('leo', 'LeoDownloader'),
+    ('lexin', 'LexinDownloader'),
+    ('mw', 'MerriamWebsterDownloader'),
+    # ('macmillan_american', 'MacmillanAmericanDownloader'),
+    ('macmillan_british', 'MacmillanBritishDownloader'),
+    ('oald', 'OaldDownloader'),
+    ('duden', 'DudenDownloader'),
+    ('den_danske_ordbog', 'DenDanskeOrdbogDownloader'),
+    ('howjsay', 'HowJSayDownloader'),
+    ('islex', 'IslexDownloader'),
+    ('collins_french', 'CollinsFrenchDownloader'),
+    ('collins_german', 'CollinsGermanDownloader'),
+    ('collins_italian', 'CollinsItalianDownloader'),
+    ('collins_spanish', 'CollinsSpanishDownloader'),
+    ('beolingus', 'BeolingusDownloader'),
 ]
 # For each word field, these downloader sites are tried in the order
 # they appear here. Lines starting with a “#” are not tried. Change
-# the order, or which lines get the “#”, to taste
+# the order, or which lines get the “#”, to taste. Each line is the
+# module in this directory and the class in that module.
+# The AudioPackDownloader asks Japanesepod for what is not in the
+# audio packs (see audio_pack.py), so don’t use both.
 
 
-# # For testing. See also the “Uncomment this …” bit in ..download
-# downloaders = [
-#     DictNNDownloader(),
+# # For testing. See also the “Uncomment this …” bit in ..fetch
+# downloader_classes = [
+#     ('dict_nn', 'DictNNDownloader'),
 # ]
 
-__all__ = ['downloaders']
+downloaders = None
+# The downloader objects, once they are loaded.
+downloaders_index = {}
+# (language, split) → the downloaders for that kind of field, in the
+# order of the downloaders list.
+downloaders_lock = threading.Lock()
+
+
+def get_downloaders():
+    """
+    Return the list of downloaders.
+
+    Import the modules and create the downloaders on the first call.
+    """
+    global downloaders
+    with downloaders_lock:
+        if downloaders is None:
+            downloaders = [
+                getattr(
+                    importlib.import_module('.' + module_name, __name__),
+                    class_name)()
+                for module_name, class_name in downloader_classes]
+        return downloaders
+
+
+def downloaders_for(language, split):
+    """
+    Return the downloaders that can handle this kind of field.
+
+    Ask each downloader class once for each two-letter language code
+    and remember the answer.
+    """
+    key = (language[:2].lower(), bool(split))
+    all_downloaders = get_downloaders()
+    with downloaders_lock:
+        try:
+            return downloaders_index[key]
+        except KeyError:
+            applicable = [
+                dloader for dloader in all_downloaders
+                if dloader.can_handle(*key)]
+            downloaders_index[key] = applicable
+            return applicable
+
+
+__all__ = ['get_downloaders', 'downloaders_for']
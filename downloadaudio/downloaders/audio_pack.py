@@ -0,0 +1,173 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+
+'''
+Get Japanese pronunciations from audio packs on disk.
+
+An audio pack is a zip file or a directory with files named like the
+ones we write, “漢字_かんじ.mp3”, or just “かな.mp3” for kana
+words. When the pack has the file for a kanji and kana pair we use
+that, without asking any site. Otherwise we ask Japanesepod.
+'''
+
+import os
+import threading
+import unicodedata
+import zipfile
+
+from ..blacklist import get_hash
+from ..download_entry import JpodDownloadEntry
+from .japanesepod import JapanesepodDownloader
+
+audio_pack_paths = []
+# The zip files and directories to look in, in this order. For
+# example ['/home/me/Japanese/jpod_audio.zip'].
+audio_pack_extensions = ['.mp3', '.ogg', '.flac', '.wav', '.m4a', '.opus']
+# The files in a pack we use.
+
+katakana_to_hiragana = dict((i, i - 0x60) for i in range(0x30A1, 0x30F7))
+
+
+def pack_key(kanji, kana):
+    """
+    Return the index key for a kanji and kana pair.
+
+    Spellings are compared in NFC, and katakana readings are the same
+    as hiragana readings, like equals_kana() does.
+    """
+    kanji = unicodedata.normalize('NFC', kanji)
+    kana = unicodedata.normalize('NFC', kana or kanji)
+    return kanji, kana.translate(katakana_to_hiragana)
+
+
+def member_key(member_name):
+    """Return the index key for a file in a pack, or None."""
+    stem, extension = os.path.splitext(os.path.basename(member_name))
+    if extension.lower() not in audio_pack_extensions or not stem:
+        return None
+    kanji, _, kana = stem.partition('_')
+    return pack_key(kanji, kana)
+
+
+class AudioPack(object):
+    """
+    One zip file or directory with audio files.
+
+    The index is built when we first look something up. Reading can
+    be done from any thread.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.members = None
+        # key → member name (zip) or file path (directory)
+        self.zip_file = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Build the index. Call with the lock held."""
+        if self.members is not None:
+            return
+        self.members = {}
+        if os.path.isdir(self.path):
+            for dir_path, _dirs, file_names in os.walk(self.path):
+                for file_name in file_names:
+                    self.add_member(os.path.join(dir_path, file_name))
+            return
+        try:
+            self.zip_file = zipfile.ZipFile(self.path)
+        except (IOError, zipfile.BadZipFile):
+            # No pack there (yet). Just don’t find anything.
+            return
+        for info in self.zip_file.infolist():
+            if not info.is_dir():
+                self.add_member(info.filename)
+
+    def add_member(self, member_name):
+        key = member_key(member_name)
+        if key is not None:
+            # The first file wins, like the first pack does.
+            self.members.setdefault(key, member_name)
+
+    def lookup(self, key):
+        """
+        Return (data, extension, file path) for the key, or None.
+
+        The file path is None for files from a zip file.
+        """
+        with self.lock:
+            self.load()
+            try:
+                member_name = self.members[key]
+            except KeyError:
+                return None
+            extension = os.path.splitext(member_name)[1].lower()
+            if self.zip_file is not None:
+                return self.zip_file.read(member_name), extension, None
+        try:
+            with open(member_name, 'rb') as audio_file:
+                return audio_file.read(), extension, member_name
+        except IOError:
+            return None
+
+
+audio_packs = [AudioPack(path) for path in audio_pack_paths]
+
+
+class AudioPackDownloader(JapanesepodDownloader):
+    """
+    Get audio from the audio packs, or from Japanesepod.
+
+    Use this instead of the JapanesepodDownloader. With an empty
+    audio_pack_paths it does just what that does.
+
+    The packs are always used. Only the requests to Japanesepod and
+    wwwjdic go through the circuit breaker, the one named
+    “Japanesepod”. So we still get the files from the packs when we
+    are offline.
+    """
+    breaker_per_request = True
+
+    def breaker_name(self):
+        """Return the name of the breaker for the online requests."""
+        return 'Japanesepod'
+
+    def japanesepod_entry(self, kanji=None, kana=None, extra_extras=None):
+        """
+        Return the entry from an audio pack, or download it.
+
+        This is also used for the kanji spellings we get from wwwjdic.
+        """
+        if not kanji:
+            kanji = self.field_data.kanji
+        if not kana:
+            kana = self.field_data.kana
+        key = pack_key(kanji, kana)
+        for pack in audio_packs:
+            found = pack.lookup(key)
+            if found:
+                return self.pack_entry(
+                    pack, found, kanji, kana, extra_extras)
+        return JapanesepodDownloader.japanesepod_entry(
+            self, kanji, kana, extra_extras)
+
+    def pack_entry(self, pack, found, kanji, kana, extra_extras):
+        """Return the JpodDownloadEntry for a file from a pack."""
+        file_data, extension, file_path = found
+        extras = dict(self.extras)
+        extras['Source'] = 'Audio pack'
+        extras['Pack'] = os.path.basename(pack.path)
+        if extra_extras:
+            extras.update(extra_extras)
+        entry = JpodDownloadEntry(
+            self.field_data, file_data, extras, self.site_icon,
+            get_hash(file_data))
+        entry.kanji = kanji
+        entry.kana = kana
+        entry.file_extension = extension
+        entry.source_path = file_path
+        return entry
@@ -21,6 +21,8 @@ from ..download_entry import Action, DownloadEntry
 
 class BeolingusDownloader(AudioDownloader):
     """Download audio from Beolingus"""
+    languages = ('de', 'en', 'es')
+
     def __init__(self):
         AudioDownloader.__init__(self)
         self.icon_url = 'http://dict.tu-chemnitz.de/'
@@ -55,7 +57,7 @@ class BeolingusDownloader(AudioDownloader):
         if not field_data.word:
             return
         word = field_data.word
-        word_soup = self.get_soup_from_url(self.build_word_url(word))
+        word_soup = self.get_soup_from_url(self.build_word_url(word), 'a')
         href_list = [a['href'] for a in word_soup.findAll('a')]
         href_list = uniqify_list(href_list)
         href_list = [href for href in href_list
@@ -78,11 +80,11 @@ class BeolingusDownloader(AudioDownloader):
                 # As said above, the bit in the curly braces may not be there.
                 extras['Part of speech'] = part_of_speech
             try:
-                word_path = self.get_word_file(url_to_get, word)
+                word_data = self.get_word_file(url_to_get, word)
             except ValueError:
                 continue
             entry = DownloadEntry(
-                field_data, word_path, extras, self.site_icon)
+                field_data, word_data, extras, self.site_icon)
             if self.service != 'de-en':
                 entry.action = Action.Delete
                 # Some of the English pronunciations are bad. Switch
@@ -100,7 +102,7 @@ class BeolingusDownloader(AudioDownloader):
         word_encoded = urllib.parse.quote(word.encode('utf-8'))
         popup_url = re.sub(';text=.*$', ';text=' + word_encoded, popup_url)
         popup_url = urllib.parse.urljoin(self.site_url, popup_url)
-        popup_soup = self.get_soup_from_url(popup_url)
+        popup_soup = self.get_soup_from_url(popup_url, 'a')
         # The audio link should be the only link.
         href_list = [a['href'] for a in popup_soup.findAll('a')]
         href_list = [href for href in href_list if "speak" in href]
@@ -108,7 +110,7 @@ class BeolingusDownloader(AudioDownloader):
                      if href.endswith(self.file_extension)]
         # If we don't have exactly one url, something's wrong. Assume
         # we have at least one.
-        return self.get_tempfile_from_url(
+        return self.get_audio_from_url(
             urllib.parse.urljoin(self.site_url, href_list[0]))
 
     def build_word_url(self, source):
@@ -16,6 +16,8 @@ from .collins import CollinsDownloader
 
 class CollinsFrenchDownloader(CollinsDownloader):
     """Download French audio from Collins Dictionary."""
+    languages = ('fr', )
+
     def __init__(self):
         CollinsDownloader.__init__(self)
         self.url \
@@ -16,6 +16,8 @@ from .collins import CollinsDownloader
 
 class CollinsGermanDownloader(CollinsDownloader):
     """Download German audio from Collins Dictionary."""
+    languages = ('de', )
+
     def __init__(self):
         CollinsDownloader.__init__(self)
         self.url \
@@ -16,6 +16,8 @@ from .collins import CollinsDownloader
 
 class CollinsItalianDownloader(CollinsDownloader):
     """Download Italian audio from Collins Dictionary."""
+    languages = ('it', )
+
     def __init__(self):
         CollinsDownloader.__init__(self)
         self.url \
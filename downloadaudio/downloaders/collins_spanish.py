@@ -16,6 +16,8 @@ from .collins import CollinsDownloader
 
 class CollinsSpanishDownloader(CollinsDownloader):
     """Download Spanish audio from Collins Dictionary."""
+    languages = ('es', )
+
     def __init__(self):
         CollinsDownloader.__init__(self)
         self.url \
@@ -21,6 +21,8 @@ from ..download_entry import DownloadEntry
 
 class DenDanskeOrdbogDownloader(AudioDownloader):
     """Download audio from Den Danske Ordbog"""
+    languages = ('da', )
+
 
     def __init__(self):
         AudioDownloader.__init__(self)
@@ -36,7 +38,8 @@ class DenDanskeOrdbogDownloader(AudioDownloader):
         if not field_data.word:
             return
         search_soup = self.get_soup_from_url(
-            self.url + urllib.parse.urlencode(dict(query=field_data.word)))
+            self.url + urllib.parse.urlencode(dict(query=field_data.word)),
+            'div', {'class': 'searchResultBox'})
         search_results = search_soup.find(
             'div', {'class': 'searchResultBox'}).findAll('a')
         if search_results:
@@ -44,10 +47,10 @@ class DenDanskeOrdbogDownloader(AudioDownloader):
         for link in search_results:
             try:
                 word_soup = self.get_soup_from_url(
-                    link['href'].encode('utf-8'))
+                    link['href'].encode('utf-8'), ['audio', 'span'])
                 audio_link = word_soup.find('audio').find('a')['href']
                 entry = DownloadEntry(
-                    field_data, self.get_tempfile_from_url(audio_link),
+                    field_data, self.get_audio_from_url(audio_link),
                     dict(Source='Den Danske Ordbog'), self.site_icon)
             except (AttributeError, KeyError, HTTPError):
                 # Getting HTTPErrors sometimes. Could be rate limiting.
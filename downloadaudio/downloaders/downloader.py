@@ -12,10 +12,18 @@ Class to download a files from a speaking dictionary or TTS service.
 '''
 
 
-import tempfile
+import copy
+import http.client
 import urllib.request, urllib.error, urllib.parse
 import urllib.parse
-from bs4 import BeautifulSoup as soup
+from bs4 import BeautifulSoup as soup, SoupStrainer
+
+from ..blacklist import BlacklistedError
+from ..instrumentation import statistics
+from .http_cache import response_cache, use_http_cache
+from .http_session import session
+from .site_icons import get_site_icon
+from .throttle import breaker_for, wait_for_host
 
 # Make this work without PyQt
 with_pyqt = True
@@ -34,6 +42,15 @@ def uniqify_list(seq):
     return no_dupes
 
 
+def raise_for_miss(url, miss):
+    """Raise the error we got when we first tried the URL."""
+    if miss.status is None:
+        # Same error as blacklist.get_hash raises.
+        raise BlacklistedError(
+            'Retrieved file is in blacklist. (No pronunciation found.)')
+    raise urllib.error.HTTPError(url, miss.status, miss.reason, None, None)
+
+
 class AudioDownloader(object):
     """
     Class to download a files from a dictionary or TTS service.
@@ -42,7 +59,22 @@ class AudioDownloader(object):
     pronunciations.
 
     The derived classes must implement self.download_files()
+
+    The derived classes also say what they can do, with languages and
+    handles_split, so that we only start the downloaders that may find
+    something. See downloaders_for() in __init__.py.
     """
+    languages = None
+    # The language codes, like 'de', we can download for. None means
+    # all languages.
+    handles_split = False
+    # Whether we use the kanji and kana of split (reading) data.
+    handles_plain = True
+    # Whether we use plain words.
+    breaker_per_request = False
+    # Whether the circuit breaker is checked before each request,
+    # rather than before each job. See fetch.submit_jobs().
+
     def __init__(self):
         self.language = ''
         # The language used.
@@ -74,9 +106,14 @@ class AudioDownloader(object):
         # self.download_directory”)  (and self.use_temp_files ==
         # False) we use the current directory.
         self.site_icon = None
-        # The sites’s favicon.
+        # The sites’s favicon, as SiteIcon. See maybe_get_icon().
         self.file_extension = '.mp3'
         # Most sites have mp3 files.
+        self.session = session
+        # The keep-alive connections used for all our requests. All
+        # downloaders share one session.
+        self.cache = response_cache
+        # The on-disk cache of the pages and files we got.
 
     def download_files(self, field_data):
         """Downloader functon
@@ -91,126 +128,230 @@ class AudioDownloader(object):
         than word.
 
         This function should clear the self.downloads_list and try to
-        get pronunciation files from its source, put those into tempfiles,
-        and add a DownloadEntry object to self_downloads_lists for each of
+        get pronunciation files from its source, with
+        get_audio_from_url(), and add a DownloadEntry object with the
+        audio data to self_downloads_lists for each of
         the zero or more downloaded files. (Zero when the
         self.language is wrong, there is no file &c.)
 
         """
         raise NotImplementedError("Use a class derived from this.")
 
+    def new_job(self, language):
+        """
+        Return a copy of this downloader to use for one download.
+
+        The downloaders keep the language, the current field data and
+        their results in instance variables. When we run a number of
+        downloads at the same time, each of them has to work on its
+        own copy. This is a shallow copy, so things like the session
+        and the cache are still shared with the original.
+        """
+        job = copy.copy(self)
+        job.language = language
+        job.downloads_list = []
+        return job
+
     def maybe_get_icon(self):
         """
-        Get icon for the site as a QImage if we haven’t already.
+        Set self.site_icon if we haven’t already.
 
-        Get the site icon, either the 'rel="icon"' or the favicon, for
-        the web page at url or passed in as page_html and store it as
-        a QImage. This function can be called repeatedly and loads the
-        icon only once.
+        This is cheap. The site_icon is a SiteIcon that gets the
+        actual image from disk or from the site only when it is
+        shown. This function can be called repeatedly.
         """
         if self.site_icon:
             return
         if not with_pyqt:
             self.site_icon = None
             return
-        page_request = urllib.request.Request(self.icon_url)
-        if self.user_agent:
-            page_request.add_header('User-agent', self.user_agent)
-        page_response = urllib.request.urlopen(page_request)
-        if 200 != page_response.code:
-            self.get_favicon()
-            return
-        page_soup = soup(page_response, 'html.parser')
+        self.site_icon = get_site_icon(
+            self.icon_key(), self.fetch_site_icon)
+
+    @classmethod
+    def can_handle(cls, language, split):
+        """Return whether we may find something for this kind of field."""
+        if split and not cls.handles_split:
+            return False
+        if not split and not cls.handles_plain:
+            return False
+        if cls.languages is None:
+            return True
+        return language[:2].lower() in cls.languages
+
+    def site_name(self):
+        """Return a short name for the downloader, e.g. “Duden”."""
+        name = type(self).__name__
+        if name.endswith('Downloader'):
+            return name[:-len('Downloader')]
+        return name
+
+    def breaker_name(self):
+        """Return the name of the circuit breaker for our requests."""
+        return self.site_name()
+
+    def icon_key(self):
+        """Return the name the site icon is stored under."""
+        return type(self).__name__
+
+    def fetch_site_icon(self):
+        """
+        Get icon for the site as a QImage.
+
+        Get the site icon, either the 'rel="icon"' or the favicon, for
+        the web page at icon_url and return it as a QImage, scaled
+        down when needed. Return None when that doesn’t work.
+        """
+        try:
+            page_data = self.get_data_from_url(self.icon_url)
+        except (urllib.error.HTTPError, ValueError):
+            return self.fetch_favicon()
+        page_soup = soup(page_data, 'html.parser')
         try:
             icon_url = page_soup.find(
                 name='link', attrs={'rel': 'icon'})['href']
         except (TypeError, KeyError):
-            self.get_favicon()
-            return
+            return self.fetch_favicon()
         # The url may be absolute or relative.
         if not urllib.parse.urlsplit(icon_url).netloc:
             icon_url = urllib.parse.urljoin(
                 self.url, urllib.parse.quote(icon_url.encode('utf-8')))
-        icon_request = urllib.request.Request(icon_url)
-        if self.user_agent:
-            icon_request.add_header('User-agent', self.user_agent)
-        icon_response = urllib.request.urlopen(icon_request)
-        if 200 != icon_response.code:
-            self.site_icon = None
-            return
-        self.site_icon = QImage.fromData(icon_response.read())
-        max_size = QSize(self.max_icon_size, self.max_icon_size)
-        icon_size = self.site_icon.size()
-        if icon_size.width() > max_size.width() \
-                or icon_size.height() > max_size.height():
-            self.site_icon = self.site_icon.scaled(
-                max_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        try:
+            icon_data = self.get_data_from_url(icon_url)
+        except (urllib.error.HTTPError, ValueError):
+            return None
+        return self.scale_icon(QImage.fromData(icon_data))
 
-    def get_favicon(self):
+    def fetch_favicon(self):
         """
-        Get favicon for the site.
+        Get favicon for the site as a QImage.
 
         This is called when the site_url can’t be loaded or when that
         page doesn’t contain a link tag with rel set to icon (the new
         way of doing site icons.)
         """
-        if self.site_icon:
-            return
-        if not with_pyqt:
-            self.site_icon = None
-            return
         ico_url = urllib.parse.urljoin(self.icon_url, "/favicon.ico")
-        ico_request = urllib.request.Request(ico_url)
-        if self.user_agent:
-            ico_request.add_header('User-agent', self.user_agent)
-        ico_response = urllib.request.urlopen(ico_request)
-        if 200 != ico_response.code:
-            self.site_icon = None
-            return
-        self.site_icon = QImage.fromData(ico_response.read())
+        try:
+            ico_data = self.get_data_from_url(ico_url)
+        except (urllib.error.HTTPError, ValueError):
+            return None
+        return self.scale_icon(QImage.fromData(ico_data))
+
+    def scale_icon(self, icon):
+        """Return the icon, scaled down to max_icon_size if larger."""
         max_size = QSize(self.max_icon_size, self.max_icon_size)
-        ico_size = self.site_icon.size()
-        if ico_size.width() > max_size.width() \
-                or ico_size.height() > max_size.height():
-            self.site_icon = self.site_icon.scaled(
+        icon_size = icon.size()
+        if icon_size.width() > max_size.width() \
+                or icon_size.height() > max_size.height():
+            return icon.scaled(
                 max_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        return icon
 
-    def get_data_from_url(self, url_in):
+    def get_data_from_url(self, url_in, data=None, headers=None):
         """
         Return raw data loaded from an URL.
 
         Helper function. Put in an URL and it sets the agent, sends
         the requests, checks that we got error code 200 and returns
-        the raw data only when everything is OK.
+        the raw data only when everything is OK. When we have data,
+        this is sent as a POST request. The request goes through the
+        shared keep-alive session.
+
+        GET requests are cached on disk. Known misses raise the same
+        errors as the first time, without a request. Stale pages are
+        revalidated with If-None-Match/If-Modified-Since.
         """
-        request = urllib.request.Request(url_in)
-        request.add_header('User-agent', self.user_agent)
-        response = urllib.request.urlopen(request)
-        if 200 != response.code:
-            raise ValueError(str(response.code) + ': ' + response.msg)
-        return response.read()
+        request_headers = {'User-agent': self.user_agent}
+        if headers:
+            request_headers.update(headers)
+        cached = None
+        use_cache = use_http_cache and data is None
+        if use_cache:
+            miss = self.cache.lookup_miss(url_in, self.user_agent)
+            if miss:
+                raise_for_miss(url_in, miss)
+            cached = self.cache.lookup(url_in, self.user_agent)
+            if cached and cached.fresh:
+                statistics.record_request(self.site_name(), 0, cached=True)
+                return cached.body
+            if cached and cached.etag:
+                request_headers['If-None-Match'] = cached.etag
+            if cached and cached.last_modified:
+                request_headers['If-Modified-Since'] = cached.last_modified
+        breaker = breaker_for(self.breaker_name())
+        if self.breaker_per_request and not breaker.allow():
+            raise urllib.error.URLError(
+                self.breaker_name() + ' is down at the moment.')
+        wait_for_host(urllib.parse.urlsplit(url_in).netloc)
+        try:
+            response = self.session.request(url_in, data, request_headers)
+        except (OSError, http.client.HTTPException):
+            # Timeouts, refused connections and the like.
+            breaker.record_failure()
+            raise
+        statistics.record_request(
+            self.site_name(), len(response.body or b''))
+        if response.status >= 500 or 429 == response.status:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if 304 == response.status and cached:
+            self.cache.refresh(url_in, self.user_agent)
+            return cached.body
+        if use_cache and 404 == response.status:
+            self.cache.store_miss(
+                url_in, self.user_agent, response.status, response.reason)
+        if response.status >= 400:
+            # Raise the same error urllib.request.urlopen would.
+            raise urllib.error.HTTPError(
+                url_in, response.status, response.reason, response.headers,
+                None)
+        if 200 != response.status:
+            raise ValueError(str(response.status) + ': ' + response.reason)
+        if use_cache:
+            self.cache.store(
+                url_in, self.user_agent, response.body,
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified'))
+        return response.body
 
-    def get_soup_from_url(self, url_in):
+    def remember_blacklisted(self, url_in):
+        """
+        Remember that the file at the URL is blacklisted.
+
+        The next get_data_from_url for this URL raises the blacklist
+        ValueError right away, without asking the site. Count the
+        rejection for the statistics.
+        """
+        statistics.record_blacklisted(self.site_name())
+        if use_http_cache:
+            self.cache.store_miss(url_in, self.user_agent)
+
+    def get_soup_from_url(self, url_in, name=None, attrs=None, **kwargs):
         """
         Return data loaded from an URL, as BeautifulSoup(3) object.
 
         Wrapper helper function aronud self.get_data_from_url()
+
+        When we get a tag name, attrs or other keyword arguments, build
+        the soup only from the tags that match them, the way
+        soup.findAll(name, attrs, **kwargs) would, and their
+        contents. Most downloaders need only a few tags from a big
+        page, and not building a tree for the rest is a lot faster.
         """
-        return soup(self.get_data_from_url(url_in), 'html.parser')
+        parse_only = None
+        if name is not None or attrs or kwargs:
+            parse_only = SoupStrainer(name, attrs or {}, **kwargs)
+        return soup(
+            self.get_data_from_url(url_in), 'html.parser',
+            parse_only=parse_only)
 
-    def get_tempfile_from_url(self, url_in):
+    def get_audio_from_url(self, url_in):
         """
-        Download raw data from url and put into a tempfile
+        Download an audio file and return its data.
 
-        Wrapper helper function aronud self.get_data_from_url().
+        Wrapper helper function aronud self.get_data_from_url(). The
+        data stays in RAM. The DownloadEntry writes it to disk only
+        when it goes into the media folder, or when it is played.
         """
-        data = self.get_data_from_url(url_in)
-        # We put the data into RAM first so that we don’t have to
-        # clean up the temp file when the get does not work. (Bad
-        # get_data raises all kinds of exceptions that fly through
-        # here.)
-        tfile = tempfile.NamedTemporaryFile(
-            delete=False, prefix='anki_audio_', suffix=self.file_extension)
-        tfile.write(data)
-        tfile.close()
-        return tfile.name
+        return self.get_data_from_url(url_in)
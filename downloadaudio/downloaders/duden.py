@@ -43,6 +43,8 @@ def munge_word(word):
 
 class DudenDownloader(AudioDownloader):
     """Download audio from Duden"""
+    languages = ('de', )
+
     def __init__(self):
         AudioDownloader.__init__(self)
         self.icon_url = 'http://www.duden.de/'
@@ -61,7 +63,8 @@ class DudenDownloader(AudioDownloader):
             return
         m_word = munge_word(field_data.word)
         self.maybe_get_icon()
-        word_soup = self.get_soup_from_url(self.url + m_word)
+        word_soup = self.get_soup_from_url(
+            self.url + m_word, 'a', target="_blank", title=True)
         blank_links = word_soup.findAll(name='a', target="_blank", title=True)
         for link in blank_links:
             # I expect no more than one result. So we don't catch
@@ -74,10 +77,10 @@ class DudenDownloader(AudioDownloader):
                 except AttributeError:
                     # 'NoneType' object has no attribute 'group' …
                     pass
-                word_path = self.get_tempfile_from_url(link['href'])
+                word_data = self.get_audio_from_url(link['href'])
                 self.downloads_list.append(
                     DownloadEntry(
-                        field_data, word_path, extras, self.site_icon))
+                        field_data, word_data, extras, self.site_icon))
 
     def good_link(self, link):
         """Check if link looks """
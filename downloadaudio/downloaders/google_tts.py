@@ -51,9 +51,9 @@ class GooglettsDownloader(AudioDownloader):
         self.maybe_get_icon()
         if not field_data.word:
             raise ValueError('Nothing to download')
-        word_path = self.get_tempfile_from_url(self.build_url(word))
+        word_data = self.get_audio_from_url(self.build_url(word))
         entry = DownloadEntry(
-            field_data, word_path, dict(Source='GoogleTTS'), self.site_icon)
+            field_data, word_data, dict(Source='GoogleTTS'), self.site_icon)
         entry.action = Action.Delete
         # Google is a robot voice. The pronunciations are usually
         # bad. Default to not keeping them.
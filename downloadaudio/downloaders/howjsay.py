@@ -19,6 +19,8 @@ from ..download_entry import DownloadEntry
 
 class HowJSayDownloader(AudioDownloader):
     """Download audio from HowJSay"""
+    languages = ('en', )
+
     def __init__(self):
         AudioDownloader.__init__(self)
         self.icon_url = 'http://howjsay.com'
@@ -35,9 +37,9 @@ class HowJSayDownloader(AudioDownloader):
             return
         # Replace special characters with ISO-8859-1 oct codes
         self.maybe_get_icon()
-        word_path = self.get_tempfile_from_url(
+        word_data = self.get_audio_from_url(
             self.url + urllib.parse.quote(field_data.word.encode('utf-8')) +
             self.file_extension)
         self.downloads_list.append(
             DownloadEntry(
-                field_data, word_path, dict(Source="HowJSay"), self.site_icon))
+                field_data, word_data, dict(Source="HowJSay"), self.site_icon))
@@ -0,0 +1,228 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+
+'''
+Keep the pages and files we got from the sites on disk.
+
+We often ask for the same word again: after deleting a bad file, for
+“Side audio” after “Note audio”, or for the same expression on sibling
+notes. Keep what we got for a while, so that we don’t have to ask the
+site again.
+
+The bodies are stored content-addressed, named by their SHA-256, so
+the same file from two URLs is stored only once. An SQLite index maps
+(URL, user agent) to the body and keeps the ETag and Last-Modified
+headers for revalidation. A separate table keeps known misses, that
+is URLs that gave a 404 or a blacklisted file.
+'''
+
+from collections import namedtuple
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+use_http_cache = True
+# Set this to False to always ask the sites.
+cache_ttl = 7 * 24 * 60 * 60
+# Seconds we use a cached page without asking the site again.
+miss_ttl = 24 * 60 * 60
+# Seconds we remember that a site didn’t have a word.
+max_cache_size = 200 * 1024 * 1024
+# Bytes we keep at most. The least recently used files are removed
+# first.
+
+cache_dir = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), 'cache', 'http')
+
+CachedResponse = namedtuple(
+    'CachedResponse', ['body', 'fresh', 'etag', 'last_modified'])
+"""A response from the cache. fresh is False when it should be revalidated."""
+CachedMiss = namedtuple('CachedMiss', ['status', 'reason'])
+"""A remembered miss. The status is None for blacklisted files."""
+
+
+def cache_key(url, user_agent):
+    """Return the key for a request."""
+    return hashlib.sha256(
+        '{0}\n{1}'.format(url, user_agent).encode('utf-8')).hexdigest()
+
+
+class ResponseCache(object):
+    """
+    A persistent cache of HTTP responses.
+
+    The cache is opened on first use. All methods can be called from
+    the download threads.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.db = None
+        self.total_size = 0
+        self.lock = threading.Lock()
+
+    def open(self):
+        """Open or create the index. Call with the lock held."""
+        if self.db:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.db = sqlite3.connect(
+            os.path.join(self.directory, 'index.db'),
+            check_same_thread=False)
+        self.db.executescript('''
+create table if not exists responses (
+    key text primary key, url text, body_hash text, size integer,
+    fetched real, accessed real, etag text, last_modified text);
+create index if not exists responses_accessed on responses (accessed);
+create table if not exists misses (
+    key text primary key, url text, status integer, reason text,
+    added real);''')
+        self.db.execute(
+            'delete from misses where added < ?', (time.time() - miss_ttl, ))
+        self.db.commit()
+        # Count each body file once, however many responses use it.
+        self.total_size = self.db.execute(
+            'select coalesce(sum(size), 0) from (select max(size) as size '
+            'from responses group by body_hash)').fetchone()[0]
+
+    def body_path(self, body_hash):
+        """Return the file name for a body."""
+        return os.path.join(self.directory, body_hash[:2], body_hash)
+
+    def lookup(self, url, user_agent):
+        """Return the CachedResponse for the request, or None."""
+        key = cache_key(url, user_agent)
+        with self.lock:
+            self.open()
+            row = self.db.execute(
+                'select body_hash, fetched, etag, last_modified '
+                'from responses where key = ?', (key, )).fetchone()
+            if not row:
+                return None
+            body_hash, fetched, etag, last_modified = row
+            try:
+                with open(self.body_path(body_hash), 'rb') as body_file:
+                    body = body_file.read()
+            except IOError:
+                self.remove(key)
+                return None
+            self.db.execute(
+                'update responses set accessed = ? where key = ?',
+                (time.time(), key))
+            self.db.commit()
+        return CachedResponse(
+            body, time.time() - fetched < cache_ttl, etag, last_modified)
+
+    def store(self, url, user_agent, body, etag=None, last_modified=None):
+        """Store a response body."""
+        key = cache_key(url, user_agent)
+        body_hash = hashlib.sha256(body).hexdigest()
+        now = time.time()
+        with self.lock:
+            self.open()
+            self.remove(key)
+            new_body = not self.body_used(body_hash)
+            body_path = self.body_path(body_hash)
+            if not os.path.exists(body_path):
+                os.makedirs(os.path.dirname(body_path), exist_ok=True)
+                temp_path = body_path + '.tmp'
+                with open(temp_path, 'wb') as body_file:
+                    body_file.write(body)
+                os.replace(temp_path, body_path)
+            self.db.execute(
+                'insert or replace into responses '
+                'values (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, url, body_hash, len(body), now, now, etag,
+                 last_modified))
+            self.db.execute('delete from misses where key = ?', (key, ))
+            if new_body:
+                self.total_size += len(body)
+            self.evict()
+            self.db.commit()
+
+    def refresh(self, url, user_agent):
+        """Mark a cached response as fresh, after a 304."""
+        with self.lock:
+            self.open()
+            now = time.time()
+            self.db.execute(
+                'update responses set fetched = ?, accessed = ? '
+                'where key = ?', (now, now, cache_key(url, user_agent)))
+            self.db.commit()
+
+    def lookup_miss(self, url, user_agent):
+        """Return the CachedMiss for the request, or None."""
+        with self.lock:
+            self.open()
+            row = self.db.execute(
+                'select status, reason, added from misses where key = ?',
+                (cache_key(url, user_agent), )).fetchone()
+        if not row or time.time() - row[2] > miss_ttl:
+            return None
+        return CachedMiss(row[0], row[1])
+
+    def store_miss(self, url, user_agent, status=None, reason=''):
+        """
+        Remember that the site didn’t have what we wanted.
+
+        Use status None for files that were downloaded, but turned
+        out to be blacklisted.
+        """
+        key = cache_key(url, user_agent)
+        with self.lock:
+            self.open()
+            self.remove(key)
+            self.db.execute(
+                'insert or replace into misses values (?, ?, ?, ?, ?)',
+                (key, url, status, reason, time.time()))
+            self.db.commit()
+
+    def remove(self, key):
+        """Remove a response. Call with the lock held."""
+        row = self.db.execute(
+            'select body_hash, size from responses where key = ?',
+            (key, )).fetchone()
+        if not row:
+            return
+        body_hash, size = row
+        self.db.execute('delete from responses where key = ?', (key, ))
+        self.maybe_remove_body(body_hash, size)
+
+    def body_used(self, body_hash):
+        """Return whether a response uses the body. Call with the lock held."""
+        return self.db.execute(
+            'select 1 from responses where body_hash = ? limit 1',
+            (body_hash, )).fetchone() is not None
+
+    def maybe_remove_body(self, body_hash, size):
+        """Remove a body file that is no longer used."""
+        if self.body_used(body_hash):
+            return
+        self.total_size -= size
+        try:
+            os.remove(self.body_path(body_hash))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Remove the least recently used responses until we fit."""
+        if self.total_size <= max_cache_size:
+            return
+        rows = self.db.execute(
+            'select key from responses order by accessed').fetchall()
+        for (key, ) in rows:
+            if self.total_size <= max_cache_size * 0.9:
+                # Leave a bit of room, so that we don’t have to
+                # evict on every store.
+                break
+            self.remove(key)
+
+
+response_cache = ResponseCache(cache_dir)
+"""The cache the downloaders share."""
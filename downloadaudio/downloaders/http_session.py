@@ -0,0 +1,210 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+
+'''
+Keep-alive HTTP connections shared by all downloaders.
+
+A number of sites need more than one request per word, and we ask the
+same sites again and again. Keep the connections open and reuse them,
+so we pay for the TCP and TLS setup only once per site.
+'''
+
+from collections import namedtuple
+import http.client
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+
+request_timeout = 15
+# Seconds to wait for a site before we give up.
+max_idle_connections = 4
+# Number of open connections we keep for each site.
+max_redirects = 8
+# Number of redirects we follow before we give up.
+
+redirect_codes = (301, 302, 303, 307, 308)
+
+HttpResponse = namedtuple(
+    'HttpResponse', ['url', 'status', 'reason', 'headers', 'body'])
+"""What we got back from a site. The body is already decompressed."""
+
+
+def decode_body(body, content_encoding):
+    """Return the body, decompressed if it was gzip or deflate encoded."""
+    if not content_encoding:
+        return body
+    content_encoding = content_encoding.lower()
+    if content_encoding in ('gzip', 'x-gzip'):
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    if content_encoding == 'deflate':
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            # Some servers send raw deflate data without the zlib
+            # header.
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+class HttpSession(object):
+    """
+    A pool of keep-alive connections.
+
+    The connections are kept per (scheme, host). A connection is used
+    by one thread at a time, it is taken from the pool for a request
+    and put back when the response has been read completely.
+    """
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        # Seconds to wait for a site. When this is None, we use the
+        # module-wide request_timeout.
+        self.idle_connections = {}
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.bytes_received = 0
+        # Simple counters, used to show the throughput of batch
+        # downloads.
+
+    def get_connection(self, scheme, netloc):
+        """
+        Return a connection to the site and whether it is reused.
+
+        Take an idle connection from the pool or open a new one.
+        """
+        with self.lock:
+            try:
+                return self.idle_connections[(scheme, netloc)].pop(), True
+            except (KeyError, IndexError):
+                pass
+        timeout = self.timeout or request_timeout
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=timeout), False
+        return http.client.HTTPConnection(netloc, timeout=timeout), False
+
+    def release_connection(self, scheme, netloc, connection):
+        """Put the connection back into the pool, or close it."""
+        with self.lock:
+            idle_list = self.idle_connections.setdefault((scheme, netloc), [])
+            if len(idle_list) < max_idle_connections:
+                idle_list.append(connection)
+                return
+        connection.close()
+
+    def count(self, body):
+        """Count one request and the bytes we got."""
+        with self.lock:
+            self.request_count += 1
+            self.bytes_received += len(body)
+
+    def close(self):
+        """Close all idle connections."""
+        with self.lock:
+            idle_connections = self.idle_connections
+            self.idle_connections = {}
+        for idle_list in idle_connections.values():
+            for connection in idle_list:
+                connection.close()
+
+    def request(self, url, data=None, headers=None):
+        """
+        Send a request and return an HttpResponse.
+
+        Send a GET request, or a POST request when we have data, and
+        follow redirects. This does not raise on HTTP error codes,
+        look at the status of the response.
+        """
+        for _ in range(max_redirects + 1):
+            response = self.single_request(url, data, headers)
+            location = response.headers.get('Location')
+            if response.status not in redirect_codes or not location:
+                return response
+            url = urllib.parse.urljoin(url, location)
+            if response.status in (301, 302, 303):
+                # Like the browsers, make a GET out of a redirected POST.
+                data = None
+        raise urllib.error.HTTPError(
+            url, response.status, 'Too many redirects', response.headers,
+            None)
+
+    def single_request(self, url, data, headers):
+        """Send one request, without following redirects."""
+        split_url = urllib.parse.urlsplit(url)
+        request_headers = {'Accept-Encoding': 'gzip, deflate'}
+        if headers:
+            request_headers.update(headers)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if uses_proxy(split_url):
+            response = self.proxy_request(url, data, request_headers)
+            self.count(response.body)
+            return response
+        path = split_url.path or '/'
+        if split_url.query:
+            path += '?' + split_url.query
+        method = 'POST' if data is not None else 'GET'
+        while True:
+            connection, reused = self.get_connection(
+                split_url.scheme, split_url.netloc)
+            try:
+                connection.request(
+                    method, path, body=data, headers=request_headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError,
+                    BrokenPipeError):
+                connection.close()
+                if reused:
+                    # The site has closed the idle connection. Try
+                    # again with a fresh one.
+                    continue
+                raise
+            except:
+                connection.close()
+                raise
+            break
+        self.count(body)
+        if response.will_close:
+            connection.close()
+        else:
+            self.release_connection(
+                split_url.scheme, split_url.netloc, connection)
+        return HttpResponse(
+            url, response.status, response.reason, response.msg,
+            decode_body(body, response.getheader('Content-Encoding')))
+
+    def proxy_request(self, url, data, headers):
+        """
+        Send one request through urllib.
+
+        The connection pool does not know about proxies. When the user
+        has set one, simply let urllib do the work, without keep-alive.
+        """
+        request = urllib.request.Request(url, data, headers)
+        try:
+            response = urllib.request.urlopen(
+                request, timeout=self.timeout or request_timeout)
+        except urllib.error.HTTPError as http_error:
+            response = http_error
+        body = response.read()
+        return HttpResponse(
+            url, response.code, response.msg, response.headers,
+            decode_body(body, response.headers.get('Content-Encoding')))
+
+
+def uses_proxy(split_url):
+    """Return whether requests to this url should go through a proxy."""
+    proxies = urllib.request.getproxies()
+    if split_url.scheme not in proxies:
+        return False
+    return not urllib.request.proxy_bypass(split_url.hostname or '')
+
+
+session = HttpSession()
+"""The session the downloaders share."""
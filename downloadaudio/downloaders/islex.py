@@ -19,6 +19,8 @@ from ..download_entry import DownloadEntry
 
 class IslexDownloader(AudioDownloader):
     """Download audio from Islex"""
+    languages = ('is', )
+
 
     def __init__(self):
         AudioDownloader.__init__(self)
@@ -71,7 +73,7 @@ class IslexDownloader(AudioDownloader):
             pass
         entry = DownloadEntry(
             self.field_data,
-            self.get_tempfile_from_url(
+            self.get_audio_from_url(
                 self.url + soup.find('audio').find(
                     'source', type="audio/mp3")['src']),
             extras, self.site_icon)
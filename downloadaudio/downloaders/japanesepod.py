@@ -13,9 +13,13 @@ Download Japanese pronunciations from Japanesepod
 '''
 
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy
+import json
 import os
 import re
+import threading
+import time
 import urllib.request, urllib.error, urllib.parse
 import urllib.parse
 
@@ -23,6 +27,67 @@ from ..blacklist import get_hash
 from ..download_entry import JpodDownloadEntry
 from .downloader import AudioDownloader
 
+max_variant_fetches = 4
+# Number of kanji spellings we get from Japanesepod at the same time.
+wwwjdic_ttl = 90 * 24 * 60 * 60
+# Seconds we keep what wwwjdic told us about a kana word.
+
+wwwjdic_cache_path = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), 'cache', 'wwwjdic.json')
+
+variant_executor = ThreadPoolExecutor(max_workers=max_variant_fetches)
+
+
+class WwwjdicCache(object):
+    """
+    What wwwjdic told us about kana words.
+
+    For each kana word the spellings with audio and when we asked,
+    in a JSON file. With this, looking up the same kana again doesn’t
+    go to wwwjdic at all. All methods can be called from any thread.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.words = None
+        # kana → {'time': …, 'variants': [[kanji, kana, popular], …]}
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Read the file. Call with the lock held."""
+        if self.words is not None:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as cache_file:
+                self.words = json.load(cache_file)
+        except (IOError, ValueError):
+            self.words = {}
+
+    def lookup(self, kana):
+        """Return the variants for the kana, or None when we don’t know."""
+        with self.lock:
+            self.load()
+            try:
+                word = self.words[kana]
+            except KeyError:
+                return None
+            if word['time'] + wwwjdic_ttl < time.time():
+                return None
+            return word['variants']
+
+    def store(self, kana, variants):
+        """Remember the variants for the kana."""
+        with self.lock:
+            self.load()
+            self.words[kana] = {'time': time.time(), 'variants': variants}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = '{0}.{1}.tmp'.format(self.path, threading.get_ident())
+            with open(temp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump(self.words, cache_file, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+
+
+wwwjdic_cache = WwwjdicCache(wwwjdic_cache_path)
+
 
 def equals_kana(kana1, kana2):
     """Check whether two kana strings represent the same sound
@@ -38,6 +103,10 @@ def equals_kana(kana1, kana2):
 
 class JapanesepodDownloader(AudioDownloader):
     """Download audio from Japanesepod"""
+    languages = ('ja', )
+    handles_split = True
+    handles_plain = False
+
     def __init__(self):
         AudioDownloader.__init__(self)
         self.user_agent = 'Mozilla/5.0 (X11; Ubuntu; Linux i686; rv:15.0) ' \
@@ -85,20 +154,31 @@ class JapanesepodDownloader(AudioDownloader):
 
     def get_word_from_japanesepod(
             self, kanji=None, kana=None, extra_extras=None):
+        self.downloads_list.append(
+            self.japanesepod_entry(kanji, kana, extra_extras))
+
+    def japanesepod_entry(self, kanji=None, kana=None, extra_extras=None):
+        """
+        Download one file from Japanesepod and return the entry.
+
+        Raise the blacklist ValueError when Japanesepod gives us its
+        “no audio” file.
+        """
         if not kanji:
             kanji = self.field_data.kanji
         if not kana:
             kana = self.field_data.kana
-        file_path = self.get_tempfile_from_url(self.jpod_url(kanji, kana))
+        jpod_url = self.jpod_url(kanji, kana)
+        file_data = self.get_audio_from_url(jpod_url)
         try:
-            item_hash = get_hash(file_path)
+            item_hash = get_hash(file_data)
         except ValueError:
-            # Clean up
-            os.remove(file_path)
+            # Don’t ask again for a while
+            self.remember_blacklisted(jpod_url)
             # and give up
             raise
         entry = JpodDownloadEntry(
-            self.field_data, file_path, self.extras, self.site_icon, item_hash)
+            self.field_data, file_data, self.extras, self.site_icon, item_hash)
         if kanji:
             entry.kanji = kanji
         if kana:
@@ -108,7 +188,7 @@ class JapanesepodDownloader(AudioDownloader):
             for key in extra_extras:
                 extras[key] = extra_extras[key]
             entry.extras = extras
-        self.downloads_list.append(entry)
+        return entry
 
     def jpod_url(self, kanji, kana):
         """Return a string that can be used as the url."""
@@ -120,9 +200,44 @@ class JapanesepodDownloader(AudioDownloader):
         return self.url + urllib.parse.urlencode(qdict)
 
     def get_words_from_wwwjdic(self):
+        """
+        Get the files for the kanji spellings of a kana word.
+
+        Look up the kana at wwwjdic, or in our cache of earlier
+        lookups, and get the files for all the spellings at the same
+        time.
+        """
+        kana = self.field_data.kana
+        variants = wwwjdic_cache.lookup(kana)
+        if variants is None:
+            variants = self.wwwjdic_variants(kana)
+            wwwjdic_cache.store(kana, variants)
+        futures = []
+        for audio_kanji, audio_kana, popular in variants:
+            extras = OrderedDict()
+            if popular:
+                extras['Frequency'] = 'popular'
+            futures.append(variant_executor.submit(
+                self.japanesepod_entry, audio_kanji, audio_kana, extras))
+        for future in futures:
+            # Keep the order wwwjdic gave us.
+            try:
+                self.downloads_list.append(future.result())
+            except (ValueError, OSError):
+                # Blacklisted, no file for this spelling, or the site
+                # is down. Keep the others.
+                continue
+
+    def wwwjdic_variants(self, kana):
+        """
+        Return the spellings of the kana word that have audio.
+
+        Ask wwwjdic and return a list of [kanji, kana, popular] lists.
+        """
         soup = self.get_soup_from_url(
             self.wwwjdic_url.format(
-                kana=urllib.parse.quote(self.field_data.kana.encode('utf-8'))))
+                kana=urllib.parse.quote(kana.encode('utf-8'))),
+            'label')
         # get 50 entries (no idea what the 2 means)
         labels = soup.findAll('label')
         hits = OrderedDict()
@@ -148,25 +263,20 @@ class JapanesepodDownloader(AudioDownloader):
             # convert brackets to delimiter (Treat “　” as a space)
             entry = re.sub('[\s《》【】]', ';', entry, flags=re.UNICODE)
             for reading in entry.split(';'):
-                if reading == self.field_data.kana:
+                if reading == kana:
                     hits[audio] = popular
                     break
+        variants = []
         for audio, popular in list(hits.items()):
-            args = urllib.parse.parse_qs(audio.encode('utf-8'))
-            audio_kanji = args['kanji'][0].decode('utf-8') \
-                if 'kanji' in args else None
-            audio_kana = args['kana'][0].decode('utf-8') \
-                if 'kana' in args else None
+            args = urllib.parse.parse_qs(audio)
+            audio_kanji = args['kanji'][0] if 'kanji' in args else None
+            audio_kana = args['kana'][0] if 'kana' in args else None
             # Sometimes there are multiple readings. Check that the audio
             # file is actually for the reading that we want.
-            if audio_kana and not equals_kana(
-                    audio_kana, self.field_data.kana):
+            if audio_kana and not equals_kana(audio_kana, kana):
                 continue
             if not audio_kanji or audio_kana == audio_kanji:
                 # Probably got this file already in the first round.
                 continue
-            extras = OrderedDict()
-            if popular:
-                extras['Frequency'] = 'popular'
-            self.get_word_from_japanesepod(
-                audio_kanji, audio_kana, extras)
+            variants.append([audio_kanji, audio_kana, popular])
+        return variants
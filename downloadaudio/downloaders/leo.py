@@ -24,11 +24,14 @@ except ImportError:
     with_pyqt = False
 
 from .downloader import AudioDownloader
+from .site_icons import get_site_icon
 from ..download_entry import DownloadEntry
 
 
 class LeoDownloader(AudioDownloader):
     """Download audio from LEO"""
+    languages = ('de', 'en', 'fr', 'es')
+
     def __init__(self):
         AudioDownloader.__init__(self)
         self.dic_url = \
@@ -42,9 +45,6 @@ class LeoDownloader(AudioDownloader):
         self.language_dict = {'de': 'de', 'en': 'en', 'fr': 'fr', 'es': 'es'}
         # As of 2015-01-26, leo.org has no audio for these languages:
         # 'it': 'it', 'zh': 'ch', 'ru': 'ru', 'pt': 'pt', 'pl': 'pl'
-        self.site_icon_dict = {}
-        # We should keep a number of site icons handy, with the right
-        # flag for the request.
         self.icon_url_dict = {
             'de': 'http://dict.leo.org/img/favicons/ende.ico',
             'en': 'http://dict.leo.org/img/favicons/ende.ico',
@@ -116,10 +116,10 @@ class LeoDownloader(AudioDownloader):
         """
         Download audio file with a given id from leo.org.
         """
-        word_path = self.get_tempfile_from_url(
+        word_data = self.get_audio_from_url(
             self.audio_url.format(id=audio_id))
         entry = DownloadEntry(
-            self.field_data, word_path, dict(Source='Leo'), self.site_icon)
+            self.field_data, word_data, dict(Source='Leo'), self.site_icon)
         entry.word = word
         self.downloads_list.append(entry)
 
@@ -128,21 +128,19 @@ class LeoDownloader(AudioDownloader):
         Set self.site_icon to the right icon.
 
         We should use different icons, depending on the request
-        language.  We store these icons in self.site_icon_dict and use the
-        AudioDownloader.maybe_get_icon() if we don't have it yet.
+        language. Each of these icons is stored on its own.
         """
         if not with_pyqt:
             return
-        try:
-            # If this works we already have it.
-            self.site_icon = self.site_icon_dict[self.language]
-        except KeyError:
-            # We have to get it ourself. (We know it's just 16x16, so
-            # no resize. And we know the address).
-            self.site_icon_dict[self.language] = \
-                QImage.fromData(self.get_data_from_url(
-                    self.icon_url_dict[self.language]))
-            self.site_icon = self.site_icon_dict[self.language]
+        # We know it's just 16x16, so no resize. And we know the
+        # address.
+        icon_url = self.icon_url_dict[self.language]
+        self.site_icon = get_site_icon(
+            self.icon_key(),
+            lambda: QImage.fromData(self.get_data_from_url(icon_url)))
+
+    def icon_key(self):
+        return '{0}_{1}'.format(type(self).__name__, self.language)
 
     def normalize(self, word):
         """
@@ -46,6 +46,8 @@ def munge_word(word):
 
 class LexinDownloader(AudioDownloader):
     """Download audio from Lexin"""
+    languages = ('sv', )
+
     def __init__(self):
         AudioDownloader.__init__(self)
         self.icon_url = 'http://lexin.nada.kth.se/lexin/'
@@ -74,18 +76,16 @@ class LexinDownloader(AudioDownloader):
             'FCDCCA88916BAACF8B03FB48D294BA89|'
             'se.jojoman.lexin.lexingwt.client.LookUpService|'
             'lookUpWord|se.jojoman.lexin.lexingwt.client.LookUpRequest/682723451|swe_swe|' +
-            field_data.word.encode('utf-8') + '|1|2|3|4|1|5|5|1|6|1|7|')
-        request = urllib.request.Request(
-            self.url,
-            payload, headers)
+            field_data.word + '|1|2|3|4|1|5|5|1|6|1|7|')
         try:
-            response = urllib.request.urlopen(request)
+            response_data = self.get_data_from_url(
+                self.url, payload.encode('utf-8'), headers)
         except:
             self.download_v1(field_data)
             return
         # Strip leading '//OK' and
         # exchange invalid hex escapes with unicode escapes
-        data = response.read()[4:].replace('\\x', '\\u00')
+        data = response_data.decode('utf-8')[4:].replace('\\x', '\\u00')
         # data is now valid json.
         # Each word has a corresponding xml string
         # inside the list.
@@ -104,7 +104,7 @@ class LexinDownloader(AudioDownloader):
                 audio_link = self.audio_url + munge_word(audio_file)
                 entry = DownloadEntry(
                     field_data,
-                    self.get_tempfile_from_url(audio_link),
+                    self.get_audio_from_url(audio_link),
                     extras,
                     self.site_icon)
                 if audio_file == field_data.word + '.mp3':
@@ -131,10 +131,10 @@ class LexinDownloader(AudioDownloader):
         """Get pronunciations of a word in Swedish from Lexin
         using the old v1 url structure."""
 
-        file_path = self.get_tempfile_from_url(
+        file_data = self.get_audio_from_url(
             self.audio_url +
             munge_word(field_data.word) +
             self.file_extension)
         self.downloads_list.append(
             DownloadEntry(
-                field_data, file_path, dict(Source="Lexin"), self.site_icon))
+                field_data, file_data, dict(Source="Lexin"), self.site_icon))
@@ -26,6 +26,8 @@ sound_class = re.compile(r'\bsound\b')
 
 class MacmillanDownloader(AudioDownloader):
     """Download audio from Macmillan Dictionary."""
+    languages = ('en', )
+
     def __init__(self):
         AudioDownloader.__init__(self)
         self.icon_url = 'http://www.macmillandictionary.com/'
@@ -50,7 +52,8 @@ class MacmillanDownloader(AudioDownloader):
         self.maybe_get_icon()
         # Do our parsing with BeautifulSoup
         word_soup = self.get_soup_from_url(
-            self.url + urllib.parse.quote(word.encode('utf-8')))
+            self.url + urllib.parse.quote(word.encode('utf-8')),
+            True, {'class': sound_class})
         # The audio clips are stored as images with class sound and
         # the link hidden in the onclick bit.
         sounds = word_soup.findAll(True, {'class': sound_class})
@@ -58,7 +61,7 @@ class MacmillanDownloader(AudioDownloader):
             audio_url = sound_tag.get('data-src-mp3')
             if not audio_url:
                 continue
-            file_path = self.get_tempfile_from_url(audio_url)
+            file_data = self.get_audio_from_url(audio_url)
             extras = self.extras
             try:
                 alt_string = sound_tag['alt']
@@ -69,4 +72,4 @@ class MacmillanDownloader(AudioDownloader):
                     extras = copy(self.extras)
                     extras['Alt text'] = alt_string
             self.downloads_list.append(
-                DownloadEntry(field_data, file_path, extras, self.site_icon))
+                DownloadEntry(field_data, file_data, extras, self.site_icon))
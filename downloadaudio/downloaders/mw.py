@@ -33,6 +33,8 @@ def join_strings(a, b):
 
 class MerriamWebsterDownloader(AudioDownloader):
     """Download audio from Meriam-Webster"""
+    languages = ('en', )
+
     def __init__(self):
         AudioDownloader.__init__(self)
         self.file_extension = '.wav'
@@ -60,7 +62,8 @@ class MerriamWebsterDownloader(AudioDownloader):
             return
         # Do our parsing with BeautifulSoup
         word_soup = self.get_soup_from_url(
-            self.url + urllib.parse.quote(field_data.word.encode('utf-8')))
+            self.url + urllib.parse.quote(field_data.word.encode('utf-8')),
+            'input', {'class': 'au'})
         # The audio clips are stored as input tags with class au
         word_input_aus = word_soup.findAll(name='input', attrs={'class': 'au'})
         # The interesting bit it the onclick attribute and looks like
@@ -121,11 +124,11 @@ class MerriamWebsterDownloader(AudioDownloader):
             if meaning_no:
                 extras['Meaning #'] = meaning_no
             try:
-                word_path = self.get_word_file(mw_fn, field_data.word)
+                word_data = self.get_word_file(mw_fn, field_data.word)
             except ValueError:
                 continue
             entry = DownloadEntry(
-                field_data, word_path, extras, self.site_icon)
+                field_data, word_data, extras, self.site_icon)
             entry.file_extension = self.file_extension
             # .wav. The only one where we don’t get mp3s.
             self.downloads_list.append(entry)
@@ -139,10 +142,10 @@ class MerriamWebsterDownloader(AudioDownloader):
         file that points to and get that.
         """
         popup_soup = self.get_soup_from_url(
-            self.get_popup_url(base_name, word))
+            self.get_popup_url(base_name, word), 'embed')
         # The audio clip is the only embed tag.
         popup_embed = popup_soup.find(name='embed')
-        return self.get_tempfile_from_url(popup_embed['src'])
+        return self.get_audio_from_url(popup_embed['src'])
 
     def get_popup_url(self, base_name, source):
         """Build url for the MW play audio pop-up."""
@@ -26,6 +26,8 @@ sound_class = re.compile(r'\bsound\b')
 
 class OaldDownloader(AudioDownloader):
     """Download audio from Oxford Advanced Learner’s Dictionary."""
+    languages = ('en', )
+
     def __init__(self):
         AudioDownloader.__init__(self)
         self.icon_url = 'http://www.oxfordlearnersdictionaries.com/'
@@ -50,7 +52,8 @@ class OaldDownloader(AudioDownloader):
         self.maybe_get_icon()
         # Do our parsing with BeautifulSoup
         word_soup = self.get_soup_from_url(
-            self.url + urllib.parse.quote(word.encode('utf-8')))
+            self.url + urllib.parse.quote(word.encode('utf-8')),
+            True, {'class': sound_class})
         self.ws = word_soup
         # The audio clips are stored as images with class sound and
         # the link hidden in the onclick bit.
@@ -59,7 +62,7 @@ class OaldDownloader(AudioDownloader):
             audio_url = sound_tag.get('data-src-mp3')
             if not audio_url:
                 continue
-            word_path = self.get_tempfile_from_url(audio_url)
+            word_data = self.get_audio_from_url(audio_url)
             extras = self.extras
             try:
                 title_string = sound_tag['title'].replace(
@@ -71,4 +74,4 @@ class OaldDownloader(AudioDownloader):
                     extras = copy(self.extras)
                     extras['Title'] = title_string
             self.downloads_list.append(
-                DownloadEntry(field_data, word_path, extras, self.site_icon))
+                DownloadEntry(field_data, word_data, extras, self.site_icon))
@@ -0,0 +1,145 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+
+'''
+Site icons, kept on disk.
+
+Getting a site icon means loading a page, looking for the icon link,
+loading the icon and scaling it. Do that once, store the scaled icon
+as a PNG file and use that file in later sessions. Old icons are
+refreshed in the background.
+'''
+
+import os
+import threading
+import time
+
+# Make this work without PyQt
+with_pyqt = True
+try:
+    from PyQt5.QtGui import QImage
+except ImportError:
+    with_pyqt = False
+
+icon_refresh_age = 30 * 24 * 60 * 60
+# Seconds after which we get a new copy of an icon.
+icon_retry_time = 60 * 60
+# Seconds we wait before we try again to get an icon we couldn’t get.
+
+icons_cache_dir = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), 'cache', 'icons')
+
+site_icons = {}
+site_icons_lock = threading.Lock()
+
+
+class SiteIcon(object):
+    """
+    The icon of one site, loaded when it is first needed.
+
+    fetch is a function that gets the (scaled) icon from the site as
+    a QImage, or returns None. Only prefetch() does that, in the
+    download threads. image(), in the GUI thread, just reads the disk.
+    """
+    def __init__(self, key, fetch):
+        self.key = key
+        self.fetch = fetch
+        self.path = os.path.join(icons_cache_dir, key + '.png')
+        self.loaded = False
+        self.qimage = None
+        self.failed_at = None
+        # When getting the icon from the site last went wrong.
+        self.lock = threading.Lock()
+        # For loaded and qimage.
+        self.fetch_lock = threading.Lock()
+        # Held while we get the icon from the site.
+
+    def age(self):
+        """Return the age of the stored icon in seconds, or None."""
+        try:
+            return time.time() - os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def fetch_and_store(self):
+        """
+        Get the icon from the site and store it.
+
+        Do nothing when another thread is doing that already, or when
+        it went wrong less than icon_retry_time seconds ago.
+        """
+        if self.failed_at is not None \
+                and time.time() - self.failed_at < icon_retry_time:
+            return
+        if not self.fetch_lock.acquire(blocking=False):
+            return
+        try:
+            try:
+                qimage = self.fetch()
+            except Exception:
+                # Not having an icon is no reason to complain.
+                qimage = None
+            if not qimage or qimage.isNull():
+                self.failed_at = time.time()
+                return
+            self.failed_at = None
+            os.makedirs(icons_cache_dir, exist_ok=True)
+            temp_path = '{0}.{1}.tmp'.format(
+                self.path, threading.get_ident())
+            if qimage.save(temp_path, 'PNG'):
+                os.replace(temp_path, self.path)
+        finally:
+            self.fetch_lock.release()
+
+    def prefetch(self):
+        """
+        Make sure we have the icon on disk.
+
+        Call this from a download thread, so that image() finds the
+        icon when it is shown.
+        """
+        if not with_pyqt:
+            return
+        if self.loaded or self.age() is not None:
+            return
+        self.fetch_and_store()
+
+    def image(self):
+        """
+        Return the icon as QImage, or None.
+
+        Load the stored icon. When we don’t have it yet, return None
+        and leave getting it to prefetch(). Refresh old icons in the
+        background. This never waits for the network.
+        """
+        if not with_pyqt:
+            return None
+        with self.lock:
+            if self.loaded:
+                return self.qimage
+            age = self.age()
+            if age is None:
+                # Not there (yet). Look again next time.
+                return None
+            self.qimage = QImage(self.path)
+            if age > icon_refresh_age:
+                threading.Thread(
+                    target=self.fetch_and_store, daemon=True).start()
+            self.loaded = True
+            return self.qimage
+
+
+def get_site_icon(key, fetch):
+    """Return the SiteIcon for the key, creating it when needed."""
+    with site_icons_lock:
+        try:
+            return site_icons[key]
+        except KeyError:
+            site_icon = SiteIcon(key, fetch)
+            site_icons[key] = site_icon
+            return site_icon
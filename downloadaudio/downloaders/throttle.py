@@ -0,0 +1,148 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+
+'''
+Don’t ask the sites too often, and stop asking sites that are down.
+
+Each host gets a token bucket that limits the number of requests per
+second. Each downloader gets a circuit breaker: after a few failures
+in a row (timeouts, connection problems, server errors), the
+downloader is skipped for a while.
+'''
+
+import threading
+import time
+
+requests_per_second = 2.0
+# Requests we send to one host per second, on average.
+burst_size = 4
+# Requests we may send to one host at once before we slow down.
+failure_threshold = 3
+# Failures in a row after which we stop using a downloader.
+cool_down = 10 * 60
+# Seconds we skip a downloader after it failed.
+probe_timeout = 60
+# Seconds we wait for the trial job after the cool down before we let
+# another one try. The trial may not send a request at all, e.g. when
+# everything comes from the cache.
+
+throttle_lock = threading.Lock()
+buckets = {}
+breakers = {}
+
+
+class TokenBucket(object):
+    """Limit the rate of requests to one host."""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_time = time.time()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, waiting until there is one."""
+        while True:
+            with self.lock:
+                now = time.time()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.last_time) * self.rate)
+                self.last_time = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class CircuitBreaker(object):
+    """
+    Remember whether a downloader is working.
+
+    After the cool down the breaker is half open: one job may try the
+    site. Until that one succeeds or fails, the others are still
+    skipped, so we don’t send a burst of requests to a site that is
+    still down.
+    """
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+        # When we let the trial job through, while half open.
+
+    def allow(self):
+        """Return whether we should use the downloader now."""
+        with throttle_lock:
+            if self.opened_at is None:
+                return True
+            now = time.time()
+            if now - self.opened_at <= cool_down:
+                return False
+            if self.probe_started is not None \
+                    and now - self.probe_started <= probe_timeout:
+                # The trial job is still running.
+                return False
+            # One more failure opens the breaker again.
+            self.probe_started = now
+            return True
+
+    def is_open(self):
+        """Return whether the downloader is skipped, without trying it."""
+        with throttle_lock:
+            if self.opened_at is None:
+                return False
+            now = time.time()
+            return now - self.opened_at <= cool_down or (
+                self.probe_started is not None
+                and now - self.probe_started <= probe_timeout)
+
+    def record_success(self):
+        """Note that the site answered."""
+        with throttle_lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started = None
+
+    def record_failure(self):
+        """Note that the site didn’t answer."""
+        with throttle_lock:
+            self.failures += 1
+            if self.failures >= failure_threshold \
+                    or self.probe_started is not None:
+                self.opened_at = time.time()
+                self.probe_started = None
+
+
+def wait_for_host(host):
+    """Wait until we may send the next request to the host."""
+    with throttle_lock:
+        try:
+            bucket = buckets[host]
+        except KeyError:
+            bucket = TokenBucket(requests_per_second, burst_size)
+            buckets[host] = bucket
+    bucket.acquire()
+
+
+def breaker_for(name):
+    """Return the circuit breaker for the downloader name."""
+    with throttle_lock:
+        try:
+            return breakers[name]
+        except KeyError:
+            breaker = CircuitBreaker()
+            breakers[name] = breaker
+            return breaker
+
+
+def skipped_downloaders():
+    """Return the names of the downloaders we skip at the moment."""
+    with throttle_lock:
+        names = list(breakers.items())
+    return sorted(name for name, breaker in names if breaker.is_open())
@@ -0,0 +1,57 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright © 2012–15 Roland Sieker <ospalh@gmail.com>
+# Copyright © 2015 Paul Hartmann <phaaurlt@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+
+'''
+Find the audio files for a word on a Wiktionary page.
+'''
+
+from collections import OrderedDict
+import re
+
+word_ogg_re = r'/([a-f0-9])/\1[a-f0-9]/[^/]*\b{word}\b[^/]*\.ogg$'
+# This re should find only the 'real' files, not the file description
+# pages. Mediawiki builds 256 (0x100) sub-folders in the style
+# <hex_digit_1>/<hex_digit_1><hex_digit_2>. Look for that pattern.
+button_onclick_re = re.compile('"videoUrl":"([^"]+)"')
+# This seems to work to extract the url from a <button> tag's onclick
+# attribute.
+
+link_tags = ['a', 'source', 'button']
+# The tags we look at. Parse only these, see get_soup_from_url.
+
+
+def ogg_urls(word_soup, u_word):
+    """
+    Return the URLs of the ogg files for the word on the page.
+
+    u_word is the word as quoted in the page URL. Go once through the
+    links, source and button tags and test each one with a pattern
+    compiled once for this word. The URLs are returned without
+    duplicates, first the ones from links, then from sources, then
+    from buttons, like we always did.
+    """
+    word_re = re.compile(
+        word_ogg_re.format(word=re.escape(u_word)), flags=re.IGNORECASE)
+    found = dict((name, []) for name in link_tags)
+    for tag in word_soup.findAll(link_tags):
+        if tag.name == 'a':
+            # Caveat. I have seen an <a> without a href! (It was '<a
+            # id="top"></a>', maybe they handle it with CSS.)
+            url = tag.get('href')
+        elif tag.name == 'source':
+            # Seen those inside audio tags.
+            url = tag.get('src')
+        else:
+            # At least from fr.wiktionary.org i got a <button>.
+            match = button_onclick_re.search(tag.get('onclick') or '')
+            url = match.group(1) if match else None
+        if url and word_re.search(url):
+            found[tag.name].append(url)
+    return list(OrderedDict.fromkeys(
+        url for name in link_tags for url in found[name]))
@@ -0,0 +1,251 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+"""
+Run the downloaders at the same time.
+
+Each (field, downloader) pair is one job. The jobs run in a thread
+pool, so the time we wait for a note is about the time the slowest
+site needs, not the sum of all of them. To not hammer any one site,
+only a few jobs run at the same time against the same host. Sites
+that are down are skipped for a while, see downloaders/throttle.py.
+
+The downloaded files are processed (normalized, trimmed, converted) in
+a second pool, while the other downloads are still running. That pool
+uses threads, too. A process pool would have to import the add-on
+again in the child processes, which doesn’t work inside Anki, and the
+heavy lifting happens in ffmpeg processes pydub starts anyway.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import threading
+import time
+import urllib.parse
+
+from .download_entry import Action
+from .downloaders import downloaders_for
+from .downloaders.throttle import breaker_for
+from .instrumentation import statistics
+
+max_workers = 8
+# Number of downloads that run at the same time.
+max_per_host = 2
+# Number of downloads that run at the same time against one site.
+
+max_processing_workers = max(1, min(4, (os.cpu_count() or 2) - 1))
+# Number of files we process at the same time.
+max_queued_processing = 16
+# Number of downloaded files that may wait for processing. When there
+# are more, the downloads wait.
+
+executor = ThreadPoolExecutor(max_workers=max_workers)
+processing_executor = ThreadPoolExecutor(max_workers=max_processing_workers)
+processing_slots = threading.BoundedSemaphore(max_queued_processing)
+host_semaphores = {}
+host_semaphores_lock = threading.Lock()
+
+
+def host_semaphore(dloader):
+    """Return the semaphore limiting the jobs for dloader’s host."""
+    host = urllib.parse.urlsplit(dloader.url or dloader.icon_url).netloc
+    with host_semaphores_lock:
+        try:
+            return host_semaphores[host]
+        except KeyError:
+            semaphore = threading.BoundedSemaphore(max_per_host)
+            host_semaphores[host] = semaphore
+            return semaphore
+
+
+def run_job(dloader, field_data, language):
+    """
+    Download one field from one site.
+
+    Run the download on a copy of dloader and return the list of
+    DownloadEntries it found. This is what runs in the worker
+    threads.
+    """
+    job = dloader.new_job(language)
+    start = time.monotonic()
+    with host_semaphore(job):
+        try:
+            # Make it easer inside the downloader. If anything
+            # goes wrong, don't catch, or raise whatever you want.
+            job.download_files(field_data)
+        except Exception as error:
+            #  # Uncomment this raise while testing a new
+            #  # downloaders.  Also use the “For testing”
+            #  # downloaders list with your downloader in
+            #  # downloaders.__init__
+            # raise
+            # Count it, so it shows up in the download statistics.
+            statistics.record_job(
+                job.site_name(), time.monotonic() - start, [], error)
+            return []
+    statistics.record_job(
+        job.site_name(), time.monotonic() - start, job.downloads_list)
+    for entry in job.downloads_list:
+        entry.site_name = job.site_name()
+    if job.downloads_list and job.site_icon:
+        # Now that we know we will show it, get the icon, unless we
+        # already have it on disk.
+        job.site_icon.prefetch()
+    return job.downloads_list
+
+
+def process_entry(entry, entry_callback=None):
+    """Process the entry and pass it on. Runs in the processing pool."""
+    start = time.monotonic()
+    try:
+        entry.process()
+    except Exception:
+        statistics.record_processing(
+            entry.site_name, time.monotonic() - start, failed=True)
+        raise
+    statistics.record_processing(
+        entry.site_name, time.monotonic() - start,
+        failed=entry.action == Action.Delete)
+    if entry_callback:
+        entry_callback(entry)
+    return entry
+
+
+def submit_processing(entry, entry_callback=None):
+    """
+    Queue the entry for processing and return the future.
+
+    Wait when too many entries are waiting already.
+    """
+    processing_slots.acquire()
+    try:
+        future = processing_executor.submit(
+            process_entry, entry, entry_callback)
+    except:
+        processing_slots.release()
+        raise
+    future.add_done_callback(lambda _future: processing_slots.release())
+    return future
+
+
+def run_streaming_job(dloader, field_data, language, entry_callback):
+    """
+    Download one field from one site and pass on what we got.
+
+    Like run_job, but queue each entry for processing, which then
+    hands it to entry_callback. Return the processing futures.
+    """
+    return [
+        submit_processing(entry, entry_callback)
+        for entry in run_job(dloader, field_data, language)]
+
+
+def submit_jobs(field_data_list, language, entry_callback=None):
+    """
+    Start the downloads for all fields and all sites.
+
+    Return the list of futures, in the order of the fields and, for
+    each field, in the order of the sites in downloaders. Only the
+    sites that handle the language and kind of field are used. When we
+    have an entry_callback, the jobs pass their entries to that
+    instead of returning them.
+    """
+    jobs = []
+    for field_data in field_data_list:
+        if field_data.empty:
+            continue
+        for dloader in downloaders_for(language, field_data.split):
+            if not dloader.breaker_per_request \
+                    and not breaker_for(dloader.breaker_name()).allow():
+                # Skip the sites that failed a few times in a row.
+                continue
+            if entry_callback:
+                jobs.append(executor.submit(
+                    run_streaming_job, dloader, field_data, language,
+                    entry_callback))
+            else:
+                jobs.append(
+                    executor.submit(run_job, dloader, field_data, language))
+    return jobs
+
+
+def fetch_entries(field_data_list, language):
+    """
+    Download audio for all fields from all sites.
+
+    Return the DownloadEntries in the same order as the old one-by-one
+    download did. That is, field by field, and for each field in the
+    order the sites appear in downloaders.
+    """
+    retrieved_entries = []
+    for job in submit_jobs(field_data_list, language):
+        retrieved_entries += job.result()
+    return retrieved_entries
+
+
+def fetch_processed_entries(field_data_list, language):
+    """
+    Download and process audio for all fields from all sites.
+
+    Like fetch_entries, but each file is processed as soon as it is
+    there, while the other downloads go on. Files that could not be
+    processed are left out.
+    """
+    jobs = submit_jobs(field_data_list, language)
+    processing = {}
+    for job in as_completed(jobs):
+        processing[job] = [submit_processing(entry) for entry in job.result()]
+    retrieved_entries = []
+    for job in jobs:
+        for future in processing[job]:
+            try:
+                retrieved_entries.append(future.result())
+            except Exception:
+                # Counted in process_entry.
+                continue
+    return retrieved_entries
+
+
+def stream_entries(field_data_list, language, entry_callback, done_callback):
+    """
+    Download audio for all fields from all sites, as a stream.
+
+    Start the downloads and return at once. Each DownloadEntry is
+    processed and passed to entry_callback as soon as it is
+    there. After the last download and processing has finished,
+    done_callback is called. Both are called from the worker threads,
+    so they should do little more than emit a Qt signal.
+    """
+    jobs = submit_jobs(field_data_list, language, entry_callback)
+    if not jobs:
+        done_callback()
+        return jobs
+    remaining = [len(jobs)]
+    # Jobs and processing tasks that haven’t finished yet.
+    remaining_lock = threading.Lock()
+
+    def task_done(_future):
+        with remaining_lock:
+            remaining[0] -= 1
+            last_task = not remaining[0]
+        if last_task:
+            done_callback()
+
+    def job_done(future):
+        try:
+            processing = future.result()
+        except:
+            processing = []
+        with remaining_lock:
+            remaining[0] += len(processing)
+        for processing_future in processing:
+            processing_future.add_done_callback(task_done)
+        task_done(future)
+
+    for job in jobs:
+        job.add_done_callback(job_done)
+    return jobs
@@ -45,32 +45,35 @@ split_kanji_kana = False
 
 # Change this at your own risk.
 field_name_re = r'{{(?:[/^#]|[^:}]+:|)([^:}{]*%s[^:}{]*)}}'
+field_name_res = [
+    re.compile(field_name_re % afk, flags=re.IGNORECASE)
+    for afk in audio_field_keys]
+# We use the (old style) % operator rather than unicode.format()
+# because we look for {}s in the re, which would get more complicated
+# with format().
 
 
-def uniqify_list(seq):
-    """Return a copy of the list with every element appearing only once."""
-    # From http://www.peterbe.com/plog/uniqifiers-benchmark
-    no_dupes = []
-    [no_dupes.append(i) for i in seq if not no_dupes.count(i)]
-    return no_dupes
+field_plans = {}
+# model id → (model modification time, FieldPlan). What
+# source_field_name() says for each audio field of the note type.
 
+FieldPlan = namedtuple('FieldPlan', ['note_fields', 'sources'])
+# note_fields is the list of audio fields get_note_fields goes
+# through, in order. sources maps each audio field to a FieldSources.
+FieldSources = namedtuple('FieldSources', ['plain', 'reading'])
+# The source field names for an audio field, for the plain text and
+# for the reading, or None when there is no such field.
 
-def field_data(note, audio_field, reading=False):
-    """Return FieldData when we have a source field
 
-    Return FieldData when we have a matching source field for our
-    audio field.  """
-    def return_data(idx):
-        source_name = field_names[idx]
-        if reading:
-            return JapaneseFieldData(
-                source_name, audio_field, note[source_name])
-        else:
-            return FieldData(
-                source_name, audio_field, note[source_name])
+def source_field_name(field_names, audio_field, reading=False):
+    """Return the name of the source field for the audio field
 
+    Look through the field names for the field we take the text for
+    audio_field from, the reading field when reading is True. Raise
+    a KeyError when there is none. This only looks at the names, so
+    the answer is the same for all notes of a note type.
+    """
     a_name = audio_field.lower()
-    field_names = [item[0] for item in list(note.items())]
     f_names = [fn.lower() for fn in field_names]
     # First, look for just audio fields
     for afk in audio_field_keys:
@@ -82,13 +85,13 @@ def field_data(note, audio_field, reading=False):
             for cnd in sources_list:
                 for idx, lname in enumerate(f_names):
                     if cnd == lname:
-                        return return_data(idx)
+                        return field_names[idx]
             # At this point: The target name is good, but we found no
             # source name.
             if not reading:
                 # Don't give for most languages. Simply use the first
                 # field. That should work for a lot of people
-                return return_data(0)
+                return field_names[0]
             else:
                 # But that doesn't really work for Japanese.
                 raise KeyError('No source name found (case 1)')
@@ -117,7 +120,7 @@ def field_data(note, audio_field, reading=False):
         for cnd in sources_list:
             for idx, lname in enumerate(f_names):
                 if cnd == lname:
-                    return return_data(idx)
+                    return field_names[idx]
         # We do have audio or sound as sub-string but did not find a
         # maching field.
         raise KeyError('No source field found. (case 2)')
@@ -125,6 +128,68 @@ def field_data(note, audio_field, reading=False):
     raise KeyError('No source field found. (case 3)')
 
 
+def maybe_source_field_name(field_names, audio_field, reading=False):
+    """Return the name of the source field or None."""
+    try:
+        return source_field_name(field_names, audio_field, reading)
+    except KeyError:
+        return None
+
+
+def make_field_plan(field_names):
+    """Return the FieldPlan for a note type with these fields."""
+    note_fields = []
+    for afk in audio_field_keys:
+        for fn in field_names:
+            if afk in fn.lower():
+                note_fields.append(fn)
+    sources = {}
+    for audio_field in field_names:
+        sources[audio_field] = FieldSources(
+            maybe_source_field_name(field_names, audio_field),
+            maybe_source_field_name(field_names, audio_field, reading=True))
+    return FieldPlan(note_fields, sources)
+
+
+def field_plan(note):
+    """Return the FieldPlan for the note’s note type
+
+    Work it out the first time we see the note type, and again when
+    the note type was changed.
+    """
+    model = note.model()
+    try:
+        mod, plan = field_plans[model['id']]
+    except KeyError:
+        pass
+    else:
+        if mod == model['mod']:
+            return plan
+    plan = make_field_plan([fld['name'] for fld in model['flds']])
+    field_plans[model['id']] = (model['mod'], plan)
+    return plan
+
+
+side_fields = {}
+# (model id, template ord, 'qfmt' or 'afmt') → (model modification
+# time, the audio fields on that side).
+
+
+def field_data(note, audio_field, reading=False):
+    """Return FieldData when we have a source field
+
+    Return FieldData when we have a matching source field for our
+    audio field.  """
+    sources = field_plan(note).sources[audio_field]
+    source_name = sources.reading if reading else sources.plain
+    if source_name is None:
+        raise KeyError('No source field found.')
+    if reading:
+        return JapaneseFieldData(
+            source_name, audio_field, note[source_name])
+    return FieldData(source_name, audio_field, note[source_name])
+
+
 def field_data_from_kanji_kana(note, fn):
     # Do the search twice
     base_fd = field_data(note, fn)
@@ -137,6 +202,37 @@ def field_data_from_kanji_kana(note, fn):
     return read_fd
 
 
+def side_audio_fields(card, note, side):
+    """Return the names of the audio fields on one side of the card
+
+    Look for the audio fields in the template for side, 'qfmt' or
+    'afmt', the first time, and remember them until the note type
+    is changed.
+    """
+    model = note.model()
+    template = card.template()
+    key = (model['id'], template['ord'], side)
+    try:
+        mod, audio_field_names = side_fields[key]
+    except KeyError:
+        pass
+    else:
+        if mod == model['mod']:
+            return audio_field_names
+    all_field_names = set(fld['name'] for fld in model['flds'])
+    audio_field_names = []
+    seen = set()
+    for field_re in field_name_res:
+        # All fields in the template that contain 'audio' or 'sound'
+        for fn in field_re.findall(template[side]):
+            # Filter out doubles and non-existing fields.
+            if fn not in seen and fn in all_field_names:
+                seen.add(fn)
+                audio_field_names.append(fn)
+    side_fields[key] = (model['mod'], audio_field_names)
+    return audio_field_names
+
+
 def get_side_fields(card, note):
     """Return a list of FieldDatas for the currently visible side
 
@@ -144,25 +240,11 @@ def get_side_fields(card, note):
     relevant data, as FieldData objects, for audio fields where we
     have matching text fields."""
     if 'question' == mw.reviewer.state:
-        template = card.template()['qfmt']
+        side = 'qfmt'
     else:
-        template = card.template()['afmt']
-    audio_field_names = []
-    all_field_names = [item[0] for item in list(note.items())]
-    for afk in audio_field_keys:
-        # Append all fields in the current template/side that contain
-        # 'audio' or 'sound'
-        audio_field_names += re.findall(
-            field_name_re % afk, template, flags=re.IGNORECASE)
-        # We use the (old style) % operator rather than
-        # unicode.format() because we look for {}s in the re, which
-        # would get more complicated with format().
-    audio_field_names = uniqify_list(audio_field_names)
-    # Filter out non-existing fields.
-    audio_field_names = [
-        fn for fn in audio_field_names if fn in all_field_names]
+        side = 'afmt'
     field_data_list = []
-    for audio_field in audio_field_names:
+    for audio_field in side_audio_fields(card, note, side):
         try:
             field_data_list.append(field_data(note, audio_field))
         except (KeyError, ValueError):
@@ -189,28 +271,23 @@ def get_note_fields(note):
     Go through the note’s fields and return relevant data, as
     FieldData objects, for audio fields where we have matching text
     fields."""
-    field_names = [item[0] for item in list(note.items())]
     field_data_list = []
-    for afk in audio_field_keys:
-        for fn in field_names:
-            if afk not in fn.lower():
-                continue
-            if not split_kanji_kana:
-                try:
-                    field_data_list.append(field_data(note, fn, reading=True))
-                except (KeyError, ValueError):
-                    # No or empty source field.
-                    pass
-            else:
-                try:
-                    field_data_list.append(
-                        field_data_from_kanji_kana(note, fn))
-                except (KeyError, ValueError):
-                    # No or empty source field.
-                    pass
+    for fn in field_plan(note).note_fields:
+        if not split_kanji_kana:
             try:
-                field_data_list.append(field_data(note, fn))
+                field_data_list.append(field_data(note, fn, reading=True))
             except (KeyError, ValueError):
                 # No or empty source field.
                 pass
+        else:
+            try:
+                field_data_list.append(field_data_from_kanji_kana(note, fn))
+            except (KeyError, ValueError):
+                # No or empty source field.
+                pass
+        try:
+            field_data_list.append(field_data(note, fn))
+        except (KeyError, ValueError):
+            # No or empty source field.
+            pass
     return field_data_list
@@ -0,0 +1,266 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+"""
+Count what the downloads do and how long that takes.
+
+For each site we count the jobs, what they found, the errors, the
+requests, bytes and processing time, and keep a histogram of how long
+the jobs took. The time spent in each stage (download, processing,
+saving the notes) is added up, too. The numbers are kept by day, for
+the last keep_days days, in a JSON file in the cache folder. See
+statistics_gui.py for the report.
+"""
+
+import bisect
+import datetime
+import json
+import os
+import threading
+import time
+
+from .blacklist import BlacklistedError
+
+record_statistics = True
+# Set this to False to not count anything.
+keep_days = 30
+# Number of days we keep the numbers for.
+latency_buckets = [0.1, 0.25, 0.5, 1, 2, 5, 10]
+# Upper limits, in seconds, of the histogram buckets for the job
+# times. Slower jobs go into an extra last bucket.
+save_interval = 30
+# Seconds between writing the numbers to disk, at most.
+
+statistics_path = os.path.join(
+    os.path.dirname(__file__), 'cache', 'statistics.json')
+
+site_counters = [
+    'jobs', 'found', 'empty', 'errors', 'blacklisted', 'files', 'bytes',
+    'requests', 'cache_hits', 'download_seconds', 'processed',
+    'processing_errors', 'processing_seconds']
+# The numbers we keep for each site. found and empty are the jobs
+# with and without files, blacklisted the files rejected because
+# they are on the blacklist, or that the user put there.
+
+
+def new_site_stats():
+    """Return the numbers for a site we haven’t seen that day."""
+    stats = dict((counter, 0) for counter in site_counters)
+    stats['histogram'] = [0] * (len(latency_buckets) + 1)
+    stats['last_error'] = ''
+    return stats
+
+
+class Statistics(object):
+    """
+    The numbers for all sites and stages, by day.
+
+    All methods can be called from any thread.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.days = None
+        # 'YYYY-MM-DD' → {'sites': {site: stats},
+        #                 'stages': {stage: [count, seconds]}}
+        self.dirty = False
+        self.last_save = time.time()
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Read the file. Call with the lock held."""
+        if self.days is not None:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as stats_file:
+                self.days = json.load(stats_file)
+        except (IOError, ValueError):
+            self.days = {}
+
+    def today(self):
+        """Return the numbers for today. Call with the lock held."""
+        self.load()
+        day = datetime.date.today().isoformat()
+        try:
+            return self.days[day]
+        except KeyError:
+            self.days[day] = {'sites': {}, 'stages': {}}
+            oldest = (datetime.date.today() - datetime.timedelta(
+                days=keep_days)).isoformat()
+            for old_day in [d for d in self.days if d <= oldest]:
+                del self.days[old_day]
+            return self.days[day]
+
+    def site(self, site):
+        """Return today’s numbers for the site. Call with the lock held."""
+        sites = self.today()['sites']
+        try:
+            return sites[site]
+        except KeyError:
+            sites[site] = new_site_stats()
+            return sites[site]
+
+    def changed(self):
+        """Note the change, and save now and then. Call with the lock held."""
+        self.dirty = True
+        if time.time() - self.last_save > save_interval:
+            self.save_locked()
+
+    def record_job(self, site, seconds, entries, error=None):
+        """
+        Count one download job.
+
+        entries is the list of files it found. error is the exception
+        when it failed.
+        """
+        if not record_statistics:
+            return
+        with self.lock:
+            stats = self.site(site)
+            stats['jobs'] += 1
+            stats['download_seconds'] += seconds
+            stats['histogram'][
+                bisect.bisect_left(latency_buckets, seconds)] += 1
+            if error is not None:
+                if isinstance(error, BlacklistedError) \
+                        or 404 == getattr(error, 'code', None):
+                    # The site doesn’t have the word. Blacklisted
+                    # files are counted by record_blacklisted().
+                    stats['empty'] += 1
+                else:
+                    stats['errors'] += 1
+                    stats['last_error'] = '{0}: {1}'.format(
+                        type(error).__name__, error)
+            elif entries:
+                stats['found'] += 1
+                stats['files'] += len(entries)
+            else:
+                stats['empty'] += 1
+            self.add_stage('download', seconds)
+            self.changed()
+
+    def record_blacklisted(self, site):
+        """Count one file from the site rejected by the blacklist."""
+        if not record_statistics:
+            return
+        with self.lock:
+            self.site(site)['blacklisted'] += 1
+            self.changed()
+
+    def record_request(self, site, byte_count, cached=False):
+        """Count one request for a page or file, from the cache or not."""
+        if not record_statistics:
+            return
+        with self.lock:
+            stats = self.site(site)
+            if cached:
+                stats['cache_hits'] += 1
+            else:
+                stats['requests'] += 1
+                stats['bytes'] += byte_count
+            self.changed()
+
+    def record_processing(self, site, seconds, failed=False):
+        """Count one processed file from the site."""
+        if not record_statistics:
+            return
+        with self.lock:
+            stats = self.site(site)
+            stats['processed'] += 1
+            stats['processing_seconds'] += seconds
+            if failed:
+                stats['processing_errors'] += 1
+            self.add_stage('processing', seconds)
+            self.changed()
+
+    def record_stage(self, stage, seconds):
+        """Add the time spent in a stage, like 'saving notes'."""
+        if not record_statistics:
+            return
+        with self.lock:
+            self.add_stage(stage, seconds)
+            self.changed()
+
+    def add_stage(self, stage, seconds):
+        """Add to the stage numbers. Call with the lock held."""
+        count_seconds = self.today()['stages'].setdefault(stage, [0, 0])
+        count_seconds[0] += 1
+        count_seconds[1] += seconds
+
+    def totals(self):
+        """
+        Return the numbers summed over all days we have.
+
+        Return a dict site → stats and a dict stage → [count, seconds].
+        """
+        sites = {}
+        stages = {}
+        with self.lock:
+            self.load()
+            for day in sorted(self.days):
+                for site, day_stats in self.days[day]['sites'].items():
+                    stats = sites.setdefault(site, new_site_stats())
+                    for counter in site_counters:
+                        stats[counter] += day_stats.get(counter, 0)
+                    for idx, count in enumerate(
+                            day_stats.get('histogram', [])[
+                                :len(stats['histogram'])]):
+                        stats['histogram'][idx] += count
+                    if day_stats.get('last_error'):
+                        stats['last_error'] = day_stats['last_error']
+                for stage, (count, seconds) in \
+                        self.days[day]['stages'].items():
+                    count_seconds = stages.setdefault(stage, [0, 0])
+                    count_seconds[0] += count
+                    count_seconds[1] += seconds
+        return sites, stages
+
+    def save_locked(self):
+        """Write the numbers to disk. Call with the lock held."""
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = '{0}.{1}.tmp'.format(self.path, threading.get_ident())
+        with open(temp_path, 'w', encoding='utf-8') as stats_file:
+            json.dump(self.days, stats_file)
+        os.replace(temp_path, self.path)
+        self.dirty = False
+        self.last_save = time.time()
+
+    def save(self):
+        """Write the numbers to disk, if there is anything new."""
+        with self.lock:
+            self.save_locked()
+
+    def clear(self):
+        """Forget all numbers."""
+        with self.lock:
+            self.days = {}
+            self.dirty = True
+            self.save_locked()
+
+
+statistics = Statistics(statistics_path)
+"""The numbers for this add-on."""
+
+
+class StageTimer(object):
+    """
+    Add the time of a with block to a stage.
+
+    with StageTimer('saving notes'):
+        …
+    """
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *_exc_info):
+        statistics.record_stage(self.stage, time.monotonic() - self.start)
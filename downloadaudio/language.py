@@ -9,10 +9,12 @@
 Return a language code.
 """
 
-from collections import Counter
+from collections import Counter, defaultdict
 import re
 
 from aqt import mw
+from anki.hooks import addHook
+from anki.utils import ids2str
 from aqt.addcards import AddCards
 from aqt.browser import Browser
 from aqt.editcurrent import EditCurrent
@@ -30,6 +32,42 @@ old_al_code_code = 'addon_foreign_language'
 # after all.)
 fl_code_code = 'addon_audio_download_language'
 
+language_tag_re = re.compile(r'^lang_([a-z]{2,3})$', flags=re.IGNORECASE)
+
+deck_languages = {}
+# did → the language code set in the deck’s options, or None. Cleared
+# by forget_deck_languages() when the options change, here or by a
+# sync.
+
+
+def forget_deck_languages():
+    """Clear the deck language cache. Call this when options change."""
+    deck_languages.clear()
+
+
+def deck_language(did):
+    """
+    Return the language code set for the deck, or None.
+
+    Somehow it is possible to have cards with a did pointing nowhere.
+    (When you have deleted the deck they were created in. Maybe there
+    are more steps necessary.) Use the default deck for those.
+    """
+    try:
+        return deck_languages[did]
+    except KeyError:
+        pass
+    try:
+        deck_conf = mw.col.decks.confForDid(did)
+    except AssertionError:
+        deck_conf = mw.col.decks.confForDid(1)
+    try:
+        lang = deck_conf[fl_code_code]
+    except (TypeError, KeyError):
+        lang = None
+    deck_languages[did] = lang
+    return lang
+
 
 def elect_language(note):
     """
@@ -39,12 +77,10 @@ def elect_language(note):
     them use.
     """
     votes = Counter()
-    for card in note.cards():
-        try:
-            lang = mw.col.decks.confForDid(card.did)[fl_code_code]
-        except (TypeError, KeyError, AssertionError):
-            continue
-        else:
+    for did in mw.col.db.list(
+            'select did from cards where nid = ?', note.id):
+        lang = deck_language(did)
+        if lang is not None:
             votes.update((lang, ))
     # We assume that we have seen at least one language and we ignore
     # ties. (Just return one of the equally popular languages.) I
@@ -61,13 +97,65 @@ def elect_language(note):
 
 def language_code_from_tags(note):
     """Get the language set by the user for individual notes."""
-    for tag in note.tags:
+    return language_code_from_tag_list(note.tags)
+
+
+def language_code_from_tag_list(tags):
+    """Return the language of the first lang_NN tag in the list."""
+    for tag in tags:
+        match = language_tag_re.match(tag)
+        if match:
+            return match.group(1).lower()
+    raise ValueError('No language tag found')
+
+
+def language_code_from_note(note):
+    """
+    Return a language code for a note, without looking at a GUI.
+
+    Use the lang_NN tag, or the most popular language of the decks
+    the cards are in, or the default language code.
+    """
+    try:
+        return language_code_from_tags(note)
+    except ValueError:
+        pass
+    try:
+        return elect_language(note)
+    except IndexError:
+        return default_audio_language_code
+
+
+def language_codes_from_nids(nids):
+    """
+    Return a dict with the language code for each of the notes.
+
+    Do what language_code_from_note() does, for all the notes at
+    once: get the tags and the decks of the cards of all notes with
+    one query.
+    """
+    tags = {}
+    votes = defaultdict(Counter)
+    for nid, note_tags, did in mw.col.db.all(
+            'select n.id, n.tags, c.did from notes n join cards c '
+            'on c.nid = n.id where n.id in ' + ids2str(nids)):
+        tags[nid] = note_tags
+        lang = deck_language(did)
+        if lang is not None:
+            votes[nid].update((lang, ))
+    languages = {}
+    for nid in nids:
         try:
-            return re.search('^lang_([a-z]{2,3})$', tag,
-                             flags=re.IGNORECASE).group(1).lower()
-        except AttributeError:
+            languages[nid] = language_code_from_tag_list(
+                tags.get(nid, '').split())
             continue
-    raise ValueError('No language tag found')
+        except ValueError:
+            pass
+        try:
+            languages[nid] = votes[nid].most_common(1)[0][0]
+        except IndexError:
+            languages[nid] = default_audio_language_code
+    return languages
 
 
 def language_code_from_editor(note, card_edit):
@@ -95,11 +183,10 @@ def language_code_from_editor(note, card_edit):
     if isinstance(edit_parent, EditCurrent):
         return language_code_from_card(mw.reviewer.card)
     if isinstance(edit_parent, AddCards):
-        try:
-            return mw.col.decks.confForDid(
-                edit_parent.deckChooser.selectedId())[fl_code_code]
-        except (TypeError, KeyError):
+        lang = deck_language(edit_parent.deckChooser.selectedId())
+        if lang is None:
             return default_audio_language_code
+        return lang
     return default_audio_language_code
 
 
@@ -114,15 +201,16 @@ def language_code_from_card(card):
         return language_code_from_tags(note)
     except ValueError:
         pass
-    # Look at the deck conf. First get it.
-    try:
-        deck_conf = mw.col.decks.confForDid(card.did)
-    except AssertionError:
-        # Somehow it is possible to have notes with a did pointing
-        # nowhere. (When you have deleted the deck they were created
-        # in. Maybe there are more steps necessary.)
-        deck_conf = mw.col.decks.confForDid(1)
-    try:
-        return deck_conf[fl_code_code]
-    except (TypeError, KeyError):
+    lang = deck_language(card.did)
+    if lang is None:
         return default_audio_language_code
+    return lang
+
+
+def forget_deck_languages_on_sync(_stage):
+    """Clear the deck language cache. A sync may change the options."""
+    forget_deck_languages()
+
+
+addHook('profileLoaded', forget_deck_languages)
+addHook('sync', forget_deck_languages_on_sync)
@@ -0,0 +1,166 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+
+'''
+Remember which media files we wrote, by content.
+
+When we get a file we already put into the media folder, byte for
+byte, we use that file again instead of writing “word_1.flac”,
+“word_2.flac”, … That saves disk space, sync time and AnkiWeb quota.
+
+For each media folder there is a log file in the cache folder, with
+one “hash size mtime name” line per file we wrote. Lines for files
+that are gone or have another size are dropped when the log is read,
+and the log is written again when it has too many of those. Files
+with another mtime are hashed again before we use them.
+'''
+
+import hashlib
+import os
+import threading
+
+media_hashes_dir = os.path.join(
+    os.path.dirname(__file__), 'cache', 'media_hashes')
+
+hash_indices = {}
+hash_indices_lock = threading.Lock()
+
+
+class MediaHashIndex(object):
+    """
+    The files we wrote to one media folder, by SHA-256 of the content.
+
+    Loaded on first use. All methods can be called from any thread.
+    """
+    def __init__(self, media_dir):
+        self.media_dir = media_dir
+        self.log_path = os.path.join(
+            media_hashes_dir,
+            hashlib.sha256(media_dir.encode('utf-8')).hexdigest()[:16]
+            + '.txt')
+        self.files = None
+        # hash → (size, mtime in ns, name)
+        self.lock = threading.Lock()
+
+    def file_stat(self, name):
+        """Return the os.stat of the media file, or None."""
+        try:
+            return os.stat(os.path.join(self.media_dir, name))
+        except OSError:
+            return None
+
+    def file_hash(self, name):
+        """Return the SHA-256 of the media file, or None."""
+        file_hash = hashlib.sha256()
+        try:
+            with open(os.path.join(self.media_dir, name), 'rb') as media_file:
+                for chunk in iter(lambda: media_file.read(65536), b''):
+                    file_hash.update(chunk)
+        except IOError:
+            return None
+        return file_hash.hexdigest()
+
+    def load(self):
+        """Read the log. Call with the lock held."""
+        if self.files is not None:
+            return
+        self.files = {}
+        line_count = 0
+        try:
+            with open(self.log_path, 'r', encoding='utf-8') as log_file:
+                for line in log_file:
+                    try:
+                        file_hash, size, mtime, name = line.rstrip(
+                            '\n').split(' ', 3)
+                        size = int(size)
+                        mtime = int(mtime)
+                    except ValueError:
+                        # Broken, or from the old “hash size name”
+                        # logs. We can’t trust those.
+                        continue
+                    line_count += 1
+                    self.files[file_hash] = (size, mtime, name)
+        except IOError:
+            return
+        self.files = {
+            file_hash: (size, mtime, name)
+            for file_hash, (size, mtime, name) in self.files.items()
+            if self.size_ok(size, name)}
+        if line_count > 2 * len(self.files) + 10:
+            self.compact()
+
+    def size_ok(self, size, name):
+        """Return whether the media file is still there, with that size."""
+        stat = self.file_stat(name)
+        return stat is not None and stat.st_size == size
+
+    def write_line(self, log_file, file_hash, size, mtime, name):
+        """Write one line of the log."""
+        log_file.write('{0} {1} {2} {3}\n'.format(
+            file_hash, size, mtime, name))
+
+    def compact(self):
+        """Write the log with only the good lines. Call with the lock held."""
+        os.makedirs(media_hashes_dir, exist_ok=True)
+        temp_path = self.log_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as log_file:
+            for file_hash, (size, mtime, name) in self.files.items():
+                self.write_line(log_file, file_hash, size, mtime, name)
+        os.replace(temp_path, self.log_path)
+
+    def append(self, file_hash, size, mtime, name):
+        """Remember the file. Call with the lock held."""
+        self.files[file_hash] = (size, mtime, name)
+        os.makedirs(media_hashes_dir, exist_ok=True)
+        with open(self.log_path, 'a', encoding='utf-8') as log_file:
+            self.write_line(log_file, file_hash, size, mtime, name)
+
+    def lookup(self, file_hash):
+        """
+        Return the name of the media file with that hash, or None.
+
+        When the file was changed since we wrote it, look at its
+        content again. Only return it when it still has that hash.
+        """
+        with self.lock:
+            self.load()
+            try:
+                size, mtime, name = self.files[file_hash]
+            except KeyError:
+                return None
+            stat = self.file_stat(name)
+            if stat is None or stat.st_size != size:
+                del self.files[file_hash]
+                return None
+            if stat.st_mtime_ns != mtime:
+                if self.file_hash(name) != file_hash:
+                    # Same size, different sound.
+                    del self.files[file_hash]
+                    return None
+                self.append(file_hash, size, stat.st_mtime_ns, name)
+            return name
+
+    def add(self, file_hash, size, name):
+        """Remember that we wrote the file name."""
+        stat = self.file_stat(name)
+        if stat is None:
+            return
+        with self.lock:
+            self.load()
+            self.append(file_hash, size, stat.st_mtime_ns, name)
+
+
+def media_hash_index(media_dir):
+    """Return the MediaHashIndex for the folder."""
+    with hash_indices_lock:
+        try:
+            return hash_indices[media_dir]
+        except KeyError:
+            index = MediaHashIndex(media_dir)
+            hash_indices[media_dir] = index
+            return index
@@ -12,13 +12,127 @@
 Helper function to deal with file names.
 """
 
+import hashlib
 import os
 import re
-import shutil
+import threading
 import unicodedata
 
 from aqt import mw
-from anki.utils import isMac, stripHTML
+from anki.utils import stripHTML
+
+from .media_hashes import media_hash_index
+
+
+reuse_identical_files = True
+# When we get a file we already wrote to the media folder, use that
+# file again instead of writing a copy. See media_hashes.py.
+
+media_indices = {}
+media_indices_lock = threading.Lock()
+suffix_re = re.compile(r'^(.*)_([0-9]+)(\.[^.]*)?$')
+# base_N.end, as free_media_name makes them.
+
+
+def media_key(name):
+    """
+    Return the name as used to check for clashes.
+
+    Use the case folded NFC version everywhere. Mac and Windows file
+    systems don’t tell names apart that differ only in case, and HFS+
+    lists names in NFD. On other systems this makes syncing to Macs
+    and Windows work.
+    """
+    return unicodedata.normalize('NFC', name).casefold()
+
+
+class MediaNameIndex(object):
+    """
+    The names of the files in a media folder.
+
+    Keep the clash keys (see media_key()) of all the files in a set,
+    and, for each base and end, the highest _N suffix used. The folder
+    is listed again only when its mtime changes behind our back.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.keys = set()
+        self.max_suffix = {}
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        """List the folder again if it was changed. Call with the lock held."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self.mtime:
+            return
+        self.keys = set()
+        self.max_suffix = {}
+        for fname in os.listdir(self.path):
+            self.add_key(media_key(fname))
+        self.mtime = mtime
+
+    def add_key(self, key):
+        """Add one file. Call with the lock held."""
+        self.keys.add(key)
+        match = suffix_re.match(key)
+        if match:
+            stem = (match.group(1), match.group(3) or '')
+            self.max_suffix[stem] = max(
+                self.max_suffix.get(stem, 0), int(match.group(2)))
+
+    def contains(self, name):
+        """Return whether name clashes with a file in the folder."""
+        with self.lock:
+            self.refresh()
+            return media_key(name) in self.keys
+
+    def reserve(self, base, end):
+        """
+        Return a free name based on base and end and mark it as used.
+
+        Try base + end, then base_N + end with N one above the highest
+        number used so far. If no name can be found, a ValueError is
+        raised.
+        """
+        with self.lock:
+            self.refresh()
+            name = base + end
+            if media_key(name) not in self.keys:
+                self.add_key(media_key(name))
+                return name
+            suffix = self.max_suffix.get((media_key(base), media_key(end)), 0)
+            # Don't be silly. Give up after 9999.
+            for i in range(suffix + 1, 10000):
+                name = '{0}_{1}{2}'.format(base, i, end)
+                if media_key(name) not in self.keys:
+                    # Only taken when a file like “a_1_2.mp3” exists,
+                    # so this loop rarely runs more than once.
+                    self.add_key(media_key(name))
+                    return name
+        raise ValueError('Could not find free name.')
+
+    def written(self):
+        """Note that we wrote a reserved file, changing the mtime."""
+        with self.lock:
+            try:
+                self.mtime = os.stat(self.path).st_mtime
+            except OSError:
+                self.mtime = None
+
+
+def media_index(path):
+    """Return the MediaNameIndex for the folder."""
+    with media_indices_lock:
+        try:
+            return media_indices[path]
+        except KeyError:
+            index = MediaNameIndex(path)
+            media_indices[path] = index
+            return index
 
 
 def free_media_name(base, end):
@@ -37,48 +151,54 @@ def free_media_name(base, end):
     # Looks like the normalization issue has finally been
     # solved. Always use NFC versions of file names now.
     mdir = mw.col.media.dir()
-    if not exists_lc(mdir, base + end):
-        return os.path.join(mdir, base + end), base + end
-    for i in range(1, 10000):
-        # Don't be silly. Give up after 9999 tries (by falling out of
-        # this loop).
-        long_name = '{0}_{1}{2}'.format(base, i, end)
-        if not exists_lc(mdir, long_name):
-            return os.path.join(mdir, long_name), long_name
-    # The only way we can have arrived here is by unsuccessfully
-    # trying the 10000 names.
-    raise ValueError('Could not find free name.')
+    name = media_index(mdir).reserve(base, end)
+    return os.path.join(mdir, name), name
 
 
 def exists_lc(path, name):
     """Test if file name clashes with name of extant file.
 
-    On Mac OS X we, simply check if the file exists.
-    On other systems, we check if the name would clashes with an
-    existing file’s name. That is, we check for files that have the same
-    name when both are pulled to lower case and Unicode normalized.
+    We check if the name would clashes with an existing file’s
+    name. That is, we check for files that have the same name when
+    both are case folded and Unicode normalized.
     """
     # The point is that like this syncing from Linux to Macs/Windows
-    # and from Linux/Windows to Macs should work savely. Not much to
-    # do on Macs, then.
-    if isMac:
-        return os.path.exists(os.path.join(path, name))
-    ln_name = unicodedata.normalize('NFC', name.lower())
-    for fname in os.listdir(path):
-        if unicodedata.normalize('NFC', fname.lower()) == ln_name:
-            return True
-    # After the loop, none found.
-    return False
+    # and from Linux/Windows to Macs should work savely.
+    return media_index(path).contains(name)
 
 
 def unmunge_to_mediafile(dl_entry):
     """
-    Move the data to the media folder.
+    Write the data to the media folder.
+
+    Determine a free media name and write the audio data of the entry
+    there. This is always a copy of its own. Files in the processed
+    cache or in an audio pack are not linked, so that changing the
+    media file can’t change them, or the other way round. When we
+    wrote the same data before, and that file is still there, use
+    that and write nothing.
 
-    Determine a free media name and move the data there from the
-    tempfile.
+    Return the media file name and whether we reused an old file.
     """
-    media_path, media_file_name = free_media_name(
-        dl_entry.base_name, dl_entry.file_extension)
-    shutil.move(dl_entry.file_path, media_path)
-    return media_file_name
+    if reuse_identical_files:
+        hash_index = media_hash_index(mw.col.media.dir())
+        data_hash = hashlib.sha256(dl_entry.audio_data).hexdigest()
+        old_name = hash_index.lookup(data_hash)
+        if old_name:
+            return old_name, True
+    while True:
+        media_path, media_file_name = free_media_name(
+            dl_entry.base_name, dl_entry.file_extension)
+        try:
+            # Never overwrite a file. The index may be out of date,
+            # e.g. on file systems with coarse mtimes.
+            with open(media_path, 'xb') as media_file:
+                media_file.write(dl_entry.audio_data)
+        except FileExistsError:
+            # reserve() has marked the name as used. Try the next one.
+            continue
+        break
+    media_index(os.path.dirname(media_path)).written()
+    if reuse_identical_files:
+        hash_index.add(data_hash, len(dl_entry.audio_data), media_file_name)
+    return media_file_name, False
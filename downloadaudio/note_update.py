@@ -0,0 +1,152 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+"""
+Put the chosen files on the notes.
+
+This is done in two steps. plan_update() looks at the actions of the
+entries for a note and says what is to be done, without touching
+anything. commit_updates() does that for any number of notes: it
+writes the media files, adds the [sound:…] tags to the fields and then
+writes all changed notes to the collection with one statement, after
+one checkpoint.
+"""
+
+from aqt import mw
+from anki.lang import _
+from anki.utils import fieldChecksum, ids2str, intTime, stripHTMLMedia
+
+from .blacklist import add_black_hash
+from .download_entry import Action
+from .instrumentation import StageTimer, statistics
+from .mediafile_utils import unmunge_to_mediafile
+
+
+class NoteUpdate(object):
+    """What we do with the downloaded files for one note."""
+    def __init__(self, note):
+        self.note = note
+        self.media_entries = []
+        # (entry, audio field name) for the files that go into the
+        # media folder. The field name is None for files we just keep.
+        self.dropped_entries = []
+        # The entries we don’t want.
+        self.black_hashes = []
+        # (hash, site name) of the files to add to the blacklist.
+        self.files_written = 0
+        self.files_reused = 0
+        # Counted by write_media(). Reused are the files we already
+        # had in the media folder with the same content.
+
+    def write_media(self):
+        """
+        Write the media files and add them to the note in memory.
+
+        Return whether the note was changed. The note is not saved
+        here. Afterwards, the entries have dropped their audio data.
+        """
+        changed = False
+        for entry, audio_field in self.media_entries:
+            media_fn, reused = unmunge_to_mediafile(entry)
+            if reused:
+                self.files_reused += 1
+            else:
+                self.files_written += 1
+            sound_tag = '[sound:' + media_fn + ']'
+            # The name may be that of a file we wrote before. Don’t
+            # add it twice to the same field.
+            if audio_field and sound_tag not in self.note[audio_field]:
+                self.note[audio_field] += sound_tag
+                changed = True
+            entry.release()
+        for entry in self.dropped_entries:
+            entry.release()
+        for black_hash, site_name in self.black_hashes:
+            add_black_hash(black_hash)
+            if site_name:
+                statistics.record_blacklisted(site_name)
+        return changed
+
+
+def plan_update(note, entries):
+    """Return the NoteUpdate for the entries, as set by their actions."""
+    update = NoteUpdate(note)
+    for entry in entries:
+        if entry.action == Action.Add:
+            update.media_entries.append((entry, entry.audio_field_name))
+        elif entry.action == Action.Keep:
+            update.media_entries.append((entry, None))
+        else:
+            update.dropped_entries.append(entry)
+            if entry.action == Action.Blacklist:
+                update.black_hashes.append(
+                    (entry.entry_hash, entry.site_name))
+    return update
+
+
+def save_notes(notes):
+    """
+    Write the notes to the collection.
+
+    Do one checkpoint, update all notes with one executemany and
+    generate the cards like note.flush() would. Notes that are not in
+    the collection yet, like the one in the add cards dialog, are
+    left alone. They are saved when the user adds them. Return the
+    ids of the notes written.
+    """
+    if not notes:
+        return []
+    in_collection = set(mw.col.db.list(
+        'select id from notes where id in ' + ids2str(
+            [note.id for note in notes])))
+    notes = [note for note in notes if note.id in in_collection]
+    if not notes:
+        return []
+    mw.checkpoint(_('Download audio'))
+    mod = intTime()
+    usn = mw.col.usn()
+    rows = []
+    for note in notes:
+        note.mod = mod
+        note.usn = usn
+        rows.append((
+            note.joinedFields(),
+            stripHTMLMedia(
+                note.fields[mw.col.models.sortIdx(note.model())]),
+            fieldChecksum(note.fields[0]), mod, usn, note.id))
+    mw.col.db.executemany(
+        'update notes set flds = ?, sfld = ?, csum = ?, mod = ?, usn = ? '
+        'where id = ?', rows)
+    nids = [note.id for note in notes]
+    mw.col.genCards(nids)
+    return nids
+
+
+def register_media():
+    """Let Anki look at the new files in the media folder at once."""
+    try:
+        mw.col.media.findChanges()
+    except AttributeError:
+        # Not in this version of Anki. It will find them on the next
+        # media check or sync.
+        pass
+
+
+def commit_updates(updates):
+    """
+    Do the updates.
+
+    Write the media files, then save all changed notes at once.
+    Return the notes that were changed.
+    """
+    with StageTimer('saving notes'):
+        changed_notes = [
+            update.note for update in updates if update.write_media()]
+        save_notes(changed_notes)
+        if any(update.media_entries for update in updates):
+            register_media()
+    return changed_notes
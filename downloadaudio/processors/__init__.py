@@ -10,11 +10,30 @@ One just moves files and isn’t used. The other does simple audio
 processing and nmoves the files.
 """
 
-try:
-    from pydub.silence import detect_nonsilent
-    # Look for a reasonable new pydub
-except ImportError:
-    processor = None
-else:
-    from .audio_processor import AudioProcessor
-    processor = AudioProcessor()
+import threading
+
+processor = None
+processor_loaded = False
+processor_lock = threading.Lock()
+
+
+def get_processor():
+    """
+    Return the audio processor, or None.
+
+    Import pydub and create the processor on the first call, not when
+    Anki starts. Without a reasonable new pydub there is no processor.
+    """
+    global processor, processor_loaded
+    with processor_lock:
+        if not processor_loaded:
+            try:
+                from pydub.silence import detect_nonsilent
+                # Look for a reasonable new pydub
+            except ImportError:
+                processor = None
+            else:
+                from .audio_processor import AudioProcessor
+                processor = AudioProcessor()
+            processor_loaded = True
+        return processor
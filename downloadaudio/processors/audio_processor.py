@@ -12,8 +12,11 @@ Process an audio file.
 
 from pydub import AudioSegment
 from pydub.silence import detect_nonsilent
-import os
-import tempfile
+import io
+
+from . import numpy_audio
+from .processed_cache import processed_cache, processed_key, \
+    use_processed_cache
 
 load_functions = {
     'mp3': AudioSegment.from_mp3, 'ogg': AudioSegment.from_ogg,
@@ -29,6 +32,27 @@ silence_fade_length = 100  # Quick fade in and out where we found silence
 rapid_fade_length = 20
 # Rapid fade in and at the beginning or end. Mostly to avoid the click
 # of a DC offset.
+use_numpy = True
+# Use the NumPy versions of normalization, silence detection and
+# fades when NumPy is installed. They give the same results as the
+# pydub ones, only faster. Set this to False to always use pydub.
+
+
+class PydubEffects(object):
+    """The pydub originals of the functions in numpy_audio."""
+    normalize = staticmethod(lambda segment: segment.normalize())
+    detect_nonsilent = staticmethod(detect_nonsilent)
+    fade_in = staticmethod(
+        lambda segment, duration: segment.fade_in(duration))
+    fade_out = staticmethod(
+        lambda segment, duration: segment.fade_out(duration))
+
+
+def effects_for(segment):
+    """Return the module or class with the functions to use."""
+    if use_numpy and numpy_audio.can_handle(segment):
+        return numpy_audio
+    return PydubEffects
 
 
 class AudioProcessor(object):
@@ -43,22 +67,48 @@ class AudioProcessor(object):
     # there *is* a processor, rather than ask if it is useful.
 
     def process(self, dl_entry):
-        """Make new audio file in the media directory.
+        """Return processed audio data, its suffix and a file with it.
 
-        Take the audio file pointed to by dl_entry, normalize, remove silence,
-        convert to output_format.
+        Take the audio data of dl_entry, normalize, remove silence,
+        convert to output_format. When we have processed the same data
+        with the same settings before, simply return what we got then.
+        The file is in the processed cache, or None when we don’t use
+        that.
         """
         input_format = dl_entry.file_extension.lstrip('.')
+        if use_processed_cache:
+            key = processed_key(dl_entry.audio_data, (
+                input_format, output_format, silence_threshold,
+                minimum_silence_length, silence_fade_length,
+                rapid_fade_length))
+            cached = processed_cache.lookup(key, output_suffix)
+            if cached:
+                cached_path, cached_data = cached
+                return cached_data, output_suffix, cached_path
         try:
             loader = load_functions[input_format]
         except KeyError:
             loader = lambda file: AudioSegment.from_file(
                 file=file, format=input_format)
-        segment = loader(dl_entry.file_path) # This
+        segment = loader(io.BytesIO(dl_entry.audio_data)) # This
         # sometimes raised a pydub.exceptions.CouldntDecodeError
-        segment = segment.normalize()  # First normalize
+        segment = self.process_segment(segment)
+        # Now write
+        out_buffer = io.BytesIO()
+        segment.export(out_buffer, output_format)
+        processed_data = out_buffer.getvalue()
+        processed_path = None
+        if use_processed_cache:
+            processed_path = processed_cache.store(
+                key, output_suffix, processed_data)
+        return processed_data, output_suffix, processed_path
+
+    def process_segment(self, segment):
+        """Return the segment normalized, trimmed and faded."""
+        effects = effects_for(segment)
+        segment = effects.normalize(segment)  # First normalize
         # Try to remove silence
-        loud_pos = detect_nonsilent(
+        loud_pos = effects.detect_nonsilent(
             segment, min_silence_len=minimum_silence_length,
             silence_thresh=silence_threshold)
         fade_in_length = rapid_fade_length
@@ -71,12 +121,5 @@ class AudioProcessor(object):
                 fade_out_length = silence_fade_length
             if loud_p[0] > 0 or loud_p[1] < len(segment):
                 segment = segment[loud_p[0] : loud_p[1]]
-        segment = segment.fade_in(fade_in_length).fade_out(fade_out_length)
-        # Now write
-        tof = tempfile.NamedTemporaryFile(
-            delete=False, suffix=output_suffix, prefix='anki_audio_')
-        temp_out_file_name = tof.name
-        tof.close()
-        segment.export(temp_out_file_name, output_format)
-        os.unlink(dl_entry.file_path)  # Get rid of unprocessed version
-        return temp_out_file_name, output_suffix
+        segment = effects.fade_in(segment, fade_in_length)
+        return effects.fade_out(segment, fade_out_length)
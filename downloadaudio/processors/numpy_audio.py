@@ -0,0 +1,235 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+"""
+NumPy versions of the pydub functions the audio processor uses.
+
+pydub looks at the audio one millisecond slice at a time, in Python.
+These functions work on the whole sample array at once. They give the
+same results as pydub, sample for sample, including pydub’s rounding
+of milliseconds to frames, so the trim points don’t change. Only 8 and
+16 bit audio is handled, can_handle() says whether we can do a segment.
+"""
+
+from pydub.utils import db_to_float, ratio_to_db
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+sample_types = {1: '<i1', 2: '<i2'}
+# The sample widths we handle. With wider samples, the sums of squares
+# may not be exact any more.
+
+
+def can_handle(segment):
+    """Return whether we can work on the segment."""
+    return numpy is not None and segment.sample_width in sample_types
+
+
+def frame_array(segment):
+    """Return the samples of the segment as (frames, channels) array."""
+    frames = numpy.frombuffer(
+        segment.raw_data, dtype=sample_types[segment.sample_width])
+    frame_count = len(frames) // segment.channels
+    return frames[:frame_count * segment.channels].reshape(
+        frame_count, segment.channels)
+
+
+def scale(frames, factor, sample_width):
+    """
+    Multiply the samples by factor, like audioop.mul.
+
+    factor is a number or an array with one factor per frame. The
+    result is rounded down and clipped.
+    """
+    if numpy.ndim(factor):
+        factor = factor[:, None]
+    max_value = 2 ** (sample_width * 8 - 1)
+    return numpy.clip(
+        numpy.floor(frames * factor), -max_value, max_value - 1).astype(
+            frames.dtype)
+
+
+def slice_frames(frames, frame_rate, start, end):
+    """
+    Return the frames of segment[start:end], with start and end in ms.
+
+    Do what pydub does: round the positions down to whole frames and
+    pad with silence when we run past the end of the data.
+    """
+    ms_frames = frame_rate / 1000.0
+    start_frame = int(start * ms_frames)
+    end_frame = int(end * ms_frames)
+    data = frames[start_frame:end_frame]
+    missing = max(end_frame - start_frame, 0) - len(data)
+    if missing and len(data):
+        data = numpy.concatenate(
+            (data, numpy.zeros((missing, frames.shape[1]), frames.dtype)))
+    return data
+
+
+def normalize(segment, headroom=0.1):
+    """Return the segment, louder, like pydub’s normalize effect."""
+    frames = frame_array(segment)
+    if not frames.size:
+        return segment
+    peak = int(numpy.abs(frames.astype(numpy.int64)).max())
+    if peak == 0:
+        return segment
+    target_peak = segment.max_possible_amplitude * db_to_float(-headroom)
+    factor = db_to_float(ratio_to_db(target_peak / peak))
+    return segment._spawn(
+        scale(frames, factor, segment.sample_width).tobytes())
+
+
+def detect_silence(segment, min_silence_len=1000, silence_thresh=-16):
+    """
+    Return the silent sections as [start, end] list, in ms.
+
+    Like pydub.silence.detect_silence, with a seek step of 1 ms. The
+    RMS of every min_silence_len window is taken from prefix sums of
+    the squared samples.
+    """
+    seg_len = len(segment)
+    if seg_len < min_silence_len:
+        return []
+    silence_thresh = db_to_float(silence_thresh) \
+        * segment.max_possible_amplitude
+    frames = frame_array(segment)
+    frame_count, channels = frames.shape
+    square_sums = numpy.zeros(frame_count + 1, dtype=numpy.int64)
+    numpy.cumsum(
+        (frames.astype(numpy.int64) ** 2).sum(axis=1), out=square_sums[1:])
+    ms_frames = segment.frame_rate / 1000.0
+    slice_starts = numpy.arange(seg_len - min_silence_len + 1)
+    start_frames = (slice_starts * ms_frames).astype(numpy.int64)
+    end_frames = ((slice_starts + min_silence_len) * ms_frames).astype(
+        numpy.int64)
+    # pydub pads slices that run past the end with silence. That adds
+    # nothing to the sum, but counts for the number of samples.
+    sums = square_sums[numpy.minimum(end_frames, frame_count)] \
+        - square_sums[numpy.minimum(start_frames, frame_count)]
+    counts = (end_frames - start_frames) * channels
+    rms = numpy.zeros(len(slice_starts))
+    has_samples = counts > 0
+    rms[has_samples] = numpy.floor(numpy.sqrt(
+        sums[has_samples] / counts[has_samples]))
+    silence_starts = numpy.flatnonzero(rms <= silence_thresh)
+    if not len(silence_starts):
+        return []
+    # A new range starts where the next silent window doesn’t overlap
+    # the last one.
+    gaps = numpy.flatnonzero(numpy.diff(silence_starts) > min_silence_len)
+    range_starts = numpy.concatenate(
+        (silence_starts[:1], silence_starts[gaps + 1]))
+    range_ends = numpy.concatenate(
+        (silence_starts[gaps], silence_starts[-1:])) + min_silence_len
+    return [[int(start), int(end)]
+            for start, end in zip(range_starts, range_ends)]
+
+
+def detect_nonsilent(segment, min_silence_len=1000, silence_thresh=-16):
+    """
+    Return the non-silent sections as [start, end] list, in ms.
+
+    Like pydub.silence.detect_nonsilent, with a seek step of 1 ms.
+    """
+    silent_ranges = detect_silence(segment, min_silence_len, silence_thresh)
+    len_seg = len(segment)
+    if not silent_ranges:
+        return [[0, len_seg]]
+    if silent_ranges[0][0] == 0 and silent_ranges[0][1] == len_seg:
+        return []
+    prev_end_i = 0
+    nonsilent_ranges = []
+    for start_i, end_i in silent_ranges:
+        nonsilent_ranges.append([prev_end_i, start_i])
+        prev_end_i = end_i
+    if end_i != len_seg:
+        nonsilent_ranges.append([prev_end_i, len_seg])
+    if nonsilent_ranges[0] == [0, 0]:
+        nonsilent_ranges.pop(0)
+    return nonsilent_ranges
+
+
+def fade(segment, to_gain=0, from_gain=0, start=None, end=None,
+         duration=None):
+    """
+    Return the segment with a linear fade, like AudioSegment.fade.
+
+    The gain for each frame (or each ms, for fades longer than 100
+    ms) is computed at once and applied to the whole fade.
+    """
+    if to_gain == 0 and from_gain == 0:
+        return segment
+    fade_args = dict(
+        to_gain=to_gain, from_gain=from_gain, start=start, end=end,
+        duration=duration)
+    seg_len = len(segment)
+    start = min(seg_len, start) if start is not None else None
+    end = min(seg_len, end) if end is not None else None
+    if start is not None and start < 0:
+        start += seg_len
+    if end is not None and end < 0:
+        end += seg_len
+    if duration:
+        if start is not None:
+            end = start + duration
+        elif end is not None:
+            start = end - duration
+    else:
+        duration = end - start
+    if start < 0:
+        # A fade longer than the segment. Leave pydub’s handling of
+        # negative positions to pydub.
+        return segment.fade(**fade_args)
+    frames = frame_array(segment)
+    frame_rate = segment.frame_rate
+    sample_width = segment.sample_width
+    from_power = db_to_float(from_gain)
+    gain_delta = db_to_float(to_gain) - from_power
+    before_fade = slice_frames(frames, frame_rate, 0, min(start, seg_len))
+    if from_gain != 0:
+        before_fade = scale(before_fade, from_power, sample_width)
+    output = [before_fade]
+    if duration > 100:
+        # One gain step per ms.
+        scale_step = gain_delta / duration
+        for i in range(duration):
+            output.append(scale(
+                slice_frames(frames, frame_rate, start + i, start + i + 1),
+                from_power + scale_step * i, sample_width))
+    else:
+        # One gain step per frame.
+        start_frame = start * (frame_rate / 1000.0)
+        end_frame = end * (frame_rate / 1000.0)
+        fade_frames = end_frame - start_frame
+        scale_step = gain_delta / fade_frames
+        steps = numpy.arange(int(fade_frames))
+        indices = (start_frame + steps).astype(numpy.int64)
+        # Frames past the end are simply left out.
+        in_range = indices < len(frames)
+        output.append(scale(
+            frames[indices[in_range]],
+            from_power + scale_step * steps[in_range], sample_width))
+    after_fade = slice_frames(frames, frame_rate, min(end, seg_len), seg_len)
+    if to_gain != 0:
+        after_fade = scale(after_fade, db_to_float(to_gain), sample_width)
+    output.append(after_fade)
+    return segment._spawn(numpy.concatenate(output).tobytes())
+
+
+def fade_in(segment, duration):
+    """Return the segment, faded in over duration ms."""
+    return fade(segment, from_gain=-120, duration=duration, start=0)
+
+
+def fade_out(segment, duration):
+    """Return the segment, faded out over duration ms."""
+    return fade(segment, to_gain=-120, duration=duration, end=float('inf'))
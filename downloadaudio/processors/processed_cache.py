@@ -0,0 +1,119 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+"""
+Keep processed audio files on disk.
+
+We get the same file again and again: the same Japanesepod clip for
+the kanji and the kana version of a word, the same word on two notes,
+a new download after deleting a file. Processing it again gives the
+same result, so keep that. The files are named by a hash of the raw
+download and the processing settings.
+"""
+
+import hashlib
+import os
+import threading
+
+use_processed_cache = True
+# Set this to False to always process the files.
+max_processed_cache_size = 100 * 1024 * 1024
+# Bytes we keep at most. The files not used for the longest time are
+# removed first.
+
+processed_cache_dir = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), 'cache', 'processed')
+
+
+def processed_key(raw_data, settings):
+    """Return the key for the raw data processed with settings."""
+    key_hash = hashlib.sha256(raw_data)
+    key_hash.update(repr(settings).encode('utf-8'))
+    return key_hash.hexdigest()
+
+
+class ProcessedCache(object):
+    """
+    A directory of processed files.
+
+    All methods can be called from the processing threads.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.total_size = None
+        # Bytes in the cache. None until we have looked.
+        self.lock = threading.Lock()
+
+    def path(self, key, suffix):
+        """Return the file name for a key."""
+        return os.path.join(self.directory, key[:2], key + suffix)
+
+    def lookup(self, key, suffix):
+        """Return the path and the data of a processed file, or None."""
+        path = self.path(key, suffix)
+        try:
+            with open(path, 'rb') as processed_file:
+                data = processed_file.read()
+        except IOError:
+            return None
+        try:
+            # Mark as recently used.
+            os.utime(path)
+        except OSError:
+            pass
+        return path, data
+
+    def store(self, key, suffix, data):
+        """Store a processed file and return its path."""
+        path = self.path(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = '{0}.{1}.tmp'.format(path, threading.get_ident())
+        with open(temp_path, 'wb') as processed_file:
+            processed_file.write(data)
+        with self.lock:
+            try:
+                # Another thread may have stored the same key. Don’t
+                # count that file twice.
+                old_size = os.stat(path).st_size
+            except OSError:
+                old_size = 0
+            os.replace(temp_path, path)
+            if self.total_size is None:
+                self.total_size = sum(
+                    size for _path, size, _mtime in self.files())
+            else:
+                self.total_size += len(data) - old_size
+            if self.total_size > max_processed_cache_size:
+                self.evict()
+        return path
+
+    def files(self):
+        """Yield (path, size, mtime) for all files in the cache."""
+        for sub_dir in os.scandir(self.directory):
+            if not sub_dir.is_dir():
+                continue
+            for entry in os.scandir(sub_dir.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                stat = entry.stat()
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        """Remove the oldest files until we fit. Call with the lock held."""
+        for path, size, _mtime in sorted(
+                self.files(), key=lambda file_info: file_info[2]):
+            if self.total_size <= max_processed_cache_size * 0.9:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.total_size -= size
+
+
+processed_cache = ProcessedCache(processed_cache_dir)
+"""The cache the audio processor uses."""
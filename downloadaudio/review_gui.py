@@ -21,6 +21,7 @@ choices what to do wit each:
 
 import os
 
+from PyQt5.QtCore import QObject, pyqtSignal
 from PyQt5.QtGui import QIcon, QPixmap
 from PyQt5.QtWidgets import QButtonGroup, QDialog, QDialogButtonBox, QFrame, \
     QGridLayout, QLabel, QPushButton, QScrollArea, QSizePolicy, QVBoxLayout
@@ -30,8 +31,14 @@ from anki.lang import _
 from anki.sound import play, playFromText
 
 from .download_entry import Action
+from .fetch import stream_entries
 
 icons_dir = os.path.join(os.path.dirname(__file__), 'icons')
+open_reviews = set()
+# Dialogs that were closed while their downloads were still
+# running. Keep them alive until the last download is in, so that
+# they can clean up the late files.
+
 
 def review_entries(note, retrieved_data, hide_text):
     """
@@ -52,15 +59,59 @@ def review_entries(note, retrieved_data, hide_text):
     return retrieved_data
 
 
+def review_streamed_entries(note, field_data_list, language, hide_text):
+    """
+    Show the dialog box right away and add the files as they come in.
+
+    Start the downloads and show the dialog box at once. Every
+    downloaded and processed file is added as a new row, so the user
+    can listen to the first files while the slower sites are still
+    working. Files that come in after the dialog was closed are
+    deleted. When the user cancels, all files are marked for
+    deletion.
+    """
+    if not note:
+        raise ValueError('Nothing downloaded')
+    relay = EntryRelay()
+    review_files = ReviewFiles(note, [], hide_text, relay)
+    stream_entries(
+        field_data_list, language, relay.entry_ready.emit,
+        relay.finished.emit)
+    accepted = review_files.exec_()
+    if not review_files.downloads_done:
+        open_reviews.add(review_files)
+    retrieved_data = review_files.entries_list
+    if not accepted:
+        for entry in retrieved_data:
+            entry.action = Action.Delete
+        return retrieved_data
+    if not retrieved_data:
+        raise ValueError('Nothing downloaded')
+    for idx, entry in enumerate(retrieved_data):
+        entry.action = review_files.buttons_groups[idx].checkedId()
+    return retrieved_data
+
+
+class EntryRelay(QObject):
+    """Pass the entries from the download threads to the dialog."""
+    entry_ready = pyqtSignal(object)
+    finished = pyqtSignal()
+
+
 class ReviewFiles(QDialog):
     """
     A Dialog to let the user keep or discard files.
     """
 
-    def __init__(self, note, entries_list, hide_text):
+    def __init__(self, note, entries_list, hide_text, relay=None):
         super(ReviewFiles, self).__init__()
         self.note = note
         self.entries_list = entries_list
+        self.relay = relay
+        # When we have a relay, the entries are added one by one while
+        # the dialog is shown.
+        self.downloads_done = relay is None
+        self.closed = False
         self.num_columns = 8
         self.play_column = 2
         self.play_old_column = 3
@@ -70,7 +121,8 @@ class ReviewFiles(QDialog):
         self.blacklist_column = 7
         self.show_skull_and_bones = any(
             entry.entry_hash for entry in self.entries_list)
-        if not self.show_skull_and_bones:
+        if not self.show_skull_and_bones and self.downloads_done:
+            # When we stream, we don’t know yet. Keep the column.
             self.num_columns -= 1
         self.hide_text = hide_text
         if self.hide_text:
@@ -118,7 +170,12 @@ that they are sorry, will add this soon &c., click on this.""")
         self.blacklist_help_text_short = _("Blacklist this file")
         self.blacklist_empty_line_help = _(
             "Blacklisting is only used for JapanesPod files.")
+        self.downloading_text = _('Downloading…')
+        self.nothing_downloaded_text = _('Nothing downloaded.')
         self.initUI()
+        if self.relay:
+            self.relay.entry_ready.connect(self.add_entry)
+            self.relay.finished.connect(self.finish_downloads)
 
     def initUI(self):
         """Build the dialog box."""
@@ -127,7 +184,7 @@ that they are sorry, will add this soon &c., click on this.""")
         outer_layout = QVBoxLayout()
         self.setLayout(outer_layout)
         explanation = QLabel(self)
-        if len(self.entries_list) > 1:
+        if len(self.entries_list) > 1 or not self.downloads_done:
             explanation.setText(
                 _('Please select an action for each downloaded file:'))
         else:
@@ -169,13 +226,16 @@ that they are sorry, will add this soon &c., click on this.""")
         delete_head_label = QLabel(_('delete'), self)
         delete_head_label.setToolTip(self.delete_help_text_long)
         layout.addWidget(delete_head_label, 0, self.delete_column)
+        self.rows_layout = layout
         if self.show_skull_and_bones:
-            blacklist_head_label = QLabel(_('blacklist'), self)
-            blacklist_head_label.setToolTip(self.blacklist_help_text_long)
-            layout.addWidget(blacklist_head_label, 0, self.blacklist_column)
+            self.add_blacklist_head()
         rule_label = QLabel('<hr>')
         layout.addWidget(rule_label, 1, 0, 1, self.num_columns)
         self.create_rows(layout, inner_widget)
+        self.status_label = QLabel(self.downloading_text, self)
+        outer_layout.addWidget(self.status_label)
+        if self.downloads_done:
+            self.status_label.hide()
         dialog_buttons = QDialogButtonBox(self)
         dialog_buttons.addButton(QDialogButtonBox.Cancel)
         dialog_buttons.addButton(QDialogButtonBox.Ok)
@@ -183,98 +243,145 @@ that they are sorry, will add this soon &c., click on this.""")
         dialog_buttons.rejected.connect(self.reject)
         outer_layout.addWidget(dialog_buttons)
 
+    def add_blacklist_head(self):
+        """Add the head of the blacklist column."""
+        blacklist_head_label = QLabel(_('blacklist'), self)
+        blacklist_head_label.setToolTip(self.blacklist_help_text_long)
+        self.rows_layout.addWidget(
+            blacklist_head_label, 0, self.blacklist_column)
+
     def create_rows(self, layout, sarea):
         """Build the rows of the dialog box"""
-        play_button_group = QButtonGroup(sarea)
-        old_play_button_group = QButtonGroup(sarea)
-        for num, entry in enumerate(self.entries_list, 2):
-            tt_text = self.build_text_help_label(entry)
-            ico_label = QLabel('', sarea)
-            ico_label.setToolTip(tt_text)
-            if entry.icon:
-                ico_label.setPixmap(QPixmap.fromImage(entry.icon))
-            layout.addWidget(ico_label, num, 0)
-            tt_label = QLabel(entry.display_word, sarea)
-            tt_label.setToolTip(tt_text)
-            layout.addWidget(tt_label, num, 1)
-            if self.hide_text:
-                tt_label.hide()
-            # Play button.
-            t_play_button = QPushButton(sarea)
-            play_button_group.addButton(t_play_button, num-2)
-            t_play_button.setToolTip(self.play_help)
-            t_play_button.setIcon(QIcon(os.path.join(icons_dir, 'play.png')))
-            layout.addWidget(t_play_button, num, self.play_column)
-            if self.note[entry.audio_field_name]:
-                t_play_old_button = QPushButton(sarea)
-                old_play_button_group.addButton(t_play_old_button, num-2)
-                t_play_old_button.setIcon(
-                    QIcon(os.path.join(icons_dir, 'play.png')))
-                if not self.hide_text:
-                    t_play_old_button.setToolTip(
-                        self.note[entry.audio_field_name])
-                else:
-                    t_play_old_button.setToolTip(self.play_old_help_short)
-                layout.addWidget(t_play_old_button, num, self.play_old_column)
-            else:
-                dummy_label = QLabel('', sarea)
-                dummy_label.setToolTip(self.play_old_empty_line_help)
-                layout.addWidget(dummy_label, num, self.play_old_column)
-            # The group where we later look what to do:
-            t_button_group = QButtonGroup(sarea)
-            t_button_group.setExclusive(True)
-            # Now the four buttons
-            t_add_button = QPushButton(sarea)
-            t_add_button.setCheckable(True)
-            t_add_button.setFlat(True)
-            t_add_button.setToolTip(self.add_help_text_short)
-            t_add_button.setIcon(QIcon(os.path.join(icons_dir, 'add.png')))
-            layout.addWidget(t_add_button, num, self.add_column)
-            t_button_group.addButton(t_add_button, Action.Add)
-            t_keep_button = QPushButton(sarea)
-            t_keep_button.setCheckable(True)
-            t_keep_button.setFlat(True)
-            t_keep_button.setToolTip(self.keep_help_text_short)
-            t_keep_button.setIcon(QIcon(os.path.join(icons_dir, 'keep.png')))
-            layout.addWidget(t_keep_button, num, self.keep_column)
-            t_button_group.addButton(t_keep_button, Action.Keep)
-            t_delete_button = QPushButton(sarea)
-            t_delete_button.setCheckable(True)
-            t_delete_button.setFlat(True)
-            t_delete_button.setToolTip(self.delete_help_text_short)
-            t_delete_button.setIcon(
-                QIcon(os.path.join(icons_dir, 'delete.png')))
-            layout.addWidget(t_delete_button, num, self.delete_column)
-            t_button_group.addButton(t_delete_button,  Action.Delete)
-            t_blacklist_button = QPushButton(sarea)
-            t_blacklist_button.setCheckable(True)
-            t_blacklist_button.setFlat(True)
-            t_blacklist_button.setToolTip(self.blacklist_help_text_short)
-            t_blacklist_button.setIcon(
-                QIcon(os.path.join(icons_dir, 'blacklist.png')))
-            if entry.entry_hash:
-                layout.addWidget(
-                    t_blacklist_button, num, self.blacklist_column)
-            else:
-                t_blacklist_button.hide()
-                dummy_label_bl = QLabel('', sarea)
-                dummy_label_bl.setToolTip(self.blacklist_empty_line_help)
-                layout.addWidget(dummy_label_bl, num, self.blacklist_column)
-            t_button_group.button(entry.action).setChecked(True)
-            # New: check a button based on how good the downloader is.
-            t_button_group.addButton(t_blacklist_button, Action.Blacklist)
-            self.buttons_groups.append(t_button_group)
-        play_button_group.buttonClicked.connect(
+        self.rows_widget = sarea
+        self.play_button_group = QButtonGroup(sarea)
+        self.old_play_button_group = QButtonGroup(sarea)
+        for entry in self.entries_list:
+            self.add_row(entry)
+        self.play_button_group.buttonClicked.connect(
             lambda button: play(
-                self.entries_list[play_button_group.id(button)].file_path))
+                self.entries_list[
+                    self.play_button_group.id(button)].file_path))
         # N.B.: anki.sound.play() plays files from anywhere, not just
         # from the colection.media folder. We should be good,
         # here. (This behaviour may be a security risk, idk.)
-        old_play_button_group.buttonClicked.connect(
+        self.old_play_button_group.buttonClicked.connect(
             lambda button: playFromText(
                 self.note[
                     self.entries_list[
-                        old_play_button_group.id(button)].audio_field_name]))
+                        self.old_play_button_group.id(
+                            button)].audio_field_name]))
+
+    def add_row(self, entry):
+        """Build one row of the dialog box"""
+        layout = self.rows_layout
+        sarea = self.rows_widget
+        num = len(self.buttons_groups) + 2
+        tt_text = self.build_text_help_label(entry)
+        ico_label = QLabel('', sarea)
+        ico_label.setToolTip(tt_text)
+        if entry.icon:
+            icon_image = entry.icon.image()
+            if icon_image:
+                ico_label.setPixmap(QPixmap.fromImage(icon_image))
+        layout.addWidget(ico_label, num, 0)
+        tt_label = QLabel(entry.display_word, sarea)
+        tt_label.setToolTip(tt_text)
+        layout.addWidget(tt_label, num, 1)
+        if self.hide_text:
+            tt_label.hide()
+        # Play button.
+        t_play_button = QPushButton(sarea)
+        self.play_button_group.addButton(t_play_button, num-2)
+        t_play_button.setToolTip(self.play_help)
+        t_play_button.setIcon(QIcon(os.path.join(icons_dir, 'play.png')))
+        layout.addWidget(t_play_button, num, self.play_column)
+        if self.note[entry.audio_field_name]:
+            t_play_old_button = QPushButton(sarea)
+            self.old_play_button_group.addButton(t_play_old_button, num-2)
+            t_play_old_button.setIcon(
+                QIcon(os.path.join(icons_dir, 'play.png')))
+            if not self.hide_text:
+                t_play_old_button.setToolTip(
+                    self.note[entry.audio_field_name])
+            else:
+                t_play_old_button.setToolTip(self.play_old_help_short)
+            layout.addWidget(t_play_old_button, num, self.play_old_column)
+        else:
+            dummy_label = QLabel('', sarea)
+            dummy_label.setToolTip(self.play_old_empty_line_help)
+            layout.addWidget(dummy_label, num, self.play_old_column)
+        # The group where we later look what to do:
+        t_button_group = QButtonGroup(sarea)
+        t_button_group.setExclusive(True)
+        # Now the four buttons
+        t_add_button = QPushButton(sarea)
+        t_add_button.setCheckable(True)
+        t_add_button.setFlat(True)
+        t_add_button.setToolTip(self.add_help_text_short)
+        t_add_button.setIcon(QIcon(os.path.join(icons_dir, 'add.png')))
+        layout.addWidget(t_add_button, num, self.add_column)
+        t_button_group.addButton(t_add_button, Action.Add)
+        t_keep_button = QPushButton(sarea)
+        t_keep_button.setCheckable(True)
+        t_keep_button.setFlat(True)
+        t_keep_button.setToolTip(self.keep_help_text_short)
+        t_keep_button.setIcon(QIcon(os.path.join(icons_dir, 'keep.png')))
+        layout.addWidget(t_keep_button, num, self.keep_column)
+        t_button_group.addButton(t_keep_button, Action.Keep)
+        t_delete_button = QPushButton(sarea)
+        t_delete_button.setCheckable(True)
+        t_delete_button.setFlat(True)
+        t_delete_button.setToolTip(self.delete_help_text_short)
+        t_delete_button.setIcon(
+            QIcon(os.path.join(icons_dir, 'delete.png')))
+        layout.addWidget(t_delete_button, num, self.delete_column)
+        t_button_group.addButton(t_delete_button,  Action.Delete)
+        t_blacklist_button = QPushButton(sarea)
+        t_blacklist_button.setCheckable(True)
+        t_blacklist_button.setFlat(True)
+        t_blacklist_button.setToolTip(self.blacklist_help_text_short)
+        t_blacklist_button.setIcon(
+            QIcon(os.path.join(icons_dir, 'blacklist.png')))
+        if entry.entry_hash:
+            layout.addWidget(
+                t_blacklist_button, num, self.blacklist_column)
+        else:
+            t_blacklist_button.hide()
+            dummy_label_bl = QLabel('', sarea)
+            dummy_label_bl.setToolTip(self.blacklist_empty_line_help)
+            layout.addWidget(dummy_label_bl, num, self.blacklist_column)
+        t_button_group.button(entry.action).setChecked(True)
+        # New: check a button based on how good the downloader is.
+        t_button_group.addButton(t_blacklist_button, Action.Blacklist)
+        self.buttons_groups.append(t_button_group)
+
+    def add_entry(self, entry):
+        """Add a newly downloaded entry to the dialog box."""
+        if self.closed:
+            # Too late. The user has already decided.
+            entry.action = Action.Delete
+            entry.release()
+            return
+        if entry.entry_hash and not self.show_skull_and_bones:
+            self.show_skull_and_bones = True
+            self.add_blacklist_head()
+        self.entries_list.append(entry)
+        self.add_row(entry)
+        self.rows_widget.adjustSize()
+
+    def finish_downloads(self):
+        """Note that all downloads are done."""
+        self.downloads_done = True
+        open_reviews.discard(self)
+        if self.entries_list:
+            self.status_label.hide()
+        else:
+            self.status_label.setText(self.nothing_downloaded_text)
+
+    def done(self, result):
+        """Close the dialog box, remembering that we did."""
+        self.closed = True
+        super(ReviewFiles, self).done(result)
 
     def build_text_help_label(self, entry):
         """Build the bubble help text label."""
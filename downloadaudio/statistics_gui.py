@@ -0,0 +1,150 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2019 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+"""
+Show the download statistics.
+
+A table with the numbers for each site and each stage, summed over
+the days we keep, that can be saved as CSV. Use it to decide which
+sites to switch off or move down in downloaders/__init__.py.
+"""
+
+import csv
+
+from PyQt5.QtWidgets import QAction, QDialog, QDialogButtonBox, \
+    QFileDialog, QLabel, QPushButton, QTableWidget, QTableWidgetItem, \
+    QVBoxLayout
+
+from aqt import mw
+from aqt.utils import askUser, tooltip
+from anki.hooks import addHook
+from anki.lang import _
+
+from .instrumentation import keep_days, latency_buckets, statistics
+
+
+def histogram_names():
+    """Return the names of the histogram buckets, like '≤ 0.5 s'."""
+    return ['≤ {0} s'.format(limit) for limit in latency_buckets] \
+        + ['> {0} s'.format(latency_buckets[-1])]
+
+
+def site_rows(sites):
+    """Return the header and the rows of the site table."""
+    header = [
+        _('Site'), _('Jobs'), _('Found'), _('Empty'), _('Errors'),
+        _('Blacklisted'), _('Files'), _('Requests'), _('Cache hits'),
+        _('kB'), _('Avg. download s'), _('Processed'),
+        _('Processing errors'), _('Avg. processing s')] \
+        + histogram_names() + [_('Last error')]
+    rows = []
+    for site, stats in sorted(
+            sites.items(), key=lambda item: -item[1]['download_seconds']):
+        rows.append([
+            site, stats['jobs'], stats['found'], stats['empty'],
+            stats['errors'], stats['blacklisted'], stats['files'],
+            stats['requests'], stats['cache_hits'],
+            round(stats['bytes'] / 1024),
+            round(stats['download_seconds'] / max(stats['jobs'], 1), 3),
+            stats['processed'], stats['processing_errors'],
+            round(stats['processing_seconds']
+                  / max(stats['processed'], 1), 3)]
+            + stats['histogram'] + [stats['last_error']])
+    return header, rows
+
+
+def stage_rows(stages):
+    """Return the header and the rows of the stage table."""
+    header = [_('Stage'), _('Count'), _('Total s'), _('Avg. s')]
+    rows = [
+        [stage, count, round(seconds, 3), round(seconds / max(count, 1), 3)]
+        for stage, (count, seconds) in sorted(stages.items())]
+    return header, rows
+
+
+def fill_table(table, header, rows):
+    """Put the rows into the QTableWidget."""
+    table.setColumnCount(len(header))
+    table.setRowCount(len(rows))
+    table.setHorizontalHeaderLabels(header)
+    for row_idx, row in enumerate(rows):
+        for col_idx, value in enumerate(row):
+            table.setItem(row_idx, col_idx, QTableWidgetItem(str(value)))
+    table.resizeColumnsToContents()
+
+
+class StatisticsDialog(QDialog):
+    """A dialog with the numbers for the sites and the stages."""
+    def __init__(self, parent=None):
+        super(StatisticsDialog, self).__init__(parent)
+        self.setWindowTitle(_('Audio download statistics'))
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(
+            _('Numbers for the last {0} days, slowest sites first.').format(
+                keep_days)))
+        self.site_table = QTableWidget(self)
+        layout.addWidget(self.site_table)
+        self.stage_table = QTableWidget(self)
+        layout.addWidget(self.stage_table)
+        button_box = QDialogButtonBox(QDialogButtonBox.Close, self)
+        export_button = QPushButton(_('Export CSV…'), self)
+        export_button.clicked.connect(self.export_csv)
+        button_box.addButton(export_button, QDialogButtonBox.ActionRole)
+        clear_button = QPushButton(_('Clear'), self)
+        clear_button.clicked.connect(self.clear)
+        button_box.addButton(clear_button, QDialogButtonBox.ResetRole)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+        self.resize(900, 500)
+        self.fill()
+
+    def fill(self):
+        """Show the current numbers."""
+        sites, stages = statistics.totals()
+        fill_table(self.site_table, *site_rows(sites))
+        fill_table(self.stage_table, *stage_rows(stages))
+
+    def export_csv(self):
+        """Save both tables into one CSV file."""
+        path, _filter = QFileDialog.getSaveFileName(
+            self, _('Export statistics'), 'audio_download_statistics.csv',
+            _('CSV files (*.csv)'))
+        if not path:
+            return
+        sites, stages = statistics.totals()
+        with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.writer(csv_file)
+            header, rows = site_rows(sites)
+            writer.writerow(header)
+            writer.writerows(rows)
+            writer.writerow([])
+            header, rows = stage_rows(stages)
+            writer.writerow(header)
+            writer.writerows(rows)
+        tooltip(_('Statistics saved.'))
+
+    def clear(self):
+        """Forget all numbers, after asking."""
+        if askUser(_('Clear the audio download statistics?'), parent=self):
+            statistics.clear()
+            self.fill()
+
+
+def show_statistics():
+    """Show the statistics dialog."""
+    statistics.save()
+    StatisticsDialog(mw).exec_()
+
+
+mw.statistics_action = QAction(mw)
+mw.statistics_action.setText(_('Download statistics…'))
+mw.statistics_action.setToolTip(
+    _('Show how well and how fast the audio download sites work.'))
+mw.statistics_action.triggered.connect(show_statistics)
+mw.edit_media_submenu.addAction(mw.statistics_action)
+
+addHook('unloadProfile', statistics.save)